@@ -0,0 +1,79 @@
+"""
+对话查询基准：LLMService.get_conversation 在同一会话连续被戳时的管理器调用次数与耗时
+
+使用假的 conversation_manager（每次调用模拟一次数据库往返），需在 AstrBot 环境中运行：
+    python bench/bench_conversation.py [戳的次数]
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.llm import LLMService  # noqa: E402
+
+
+class FakeConversationManager:
+    """每次调用耗时 latency 秒的假对话管理器"""
+
+    def __init__(self, latency: float = 0.002):
+        self.latency = latency
+        self.calls = 0
+        self._curr: dict[str, str] = {}
+
+    async def _roundtrip(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+
+    async def get_curr_conversation_id(self, umo: str):
+        await self._roundtrip()
+        return self._curr.get(umo)
+
+    async def new_conversation(self, umo: str, platform_id: str):
+        await self._roundtrip()
+        self._curr[umo] = f"cid-{umo}"
+        return self._curr[umo]
+
+    async def get_conversation(self, umo: str, cid: str):
+        await self._roundtrip()
+        return SimpleNamespace(cid=cid, persona_id=None)
+
+
+class FakeEvent:
+    def __init__(self, umo: str):
+        self.unified_msg_origin = umo
+
+    def get_platform_id(self) -> str:
+        return "aiocqhttp"
+
+
+async def run(pokes: int) -> None:
+    manager = FakeConversationManager()
+    context = SimpleNamespace(conversation_manager=manager)
+    service = LLMService(context, None, None)  # type: ignore[arg-type]
+    event = FakeEvent("aiocqhttp:GroupMessage:123456")
+
+    start = time.perf_counter()
+    for _ in range(pokes):
+        await service.get_conversation(event)  # type: ignore[arg-type]
+    cached = time.perf_counter() - start
+    cached_calls = manager.calls
+
+    # 对照：每次都失效缓存，等价于未缓存时的调用路径
+    manager.calls = 0
+    start = time.perf_counter()
+    for _ in range(pokes):
+        service.invalidate_conversation(event.unified_msg_origin)
+        await service.get_conversation(event)  # type: ignore[arg-type]
+    uncached = time.perf_counter() - start
+
+    print(f"连续戳 {pokes} 次")
+    print(f"  无缓存: {manager.calls:>5} 次调用, {uncached * 1000 / pokes:6.2f} ms/次")
+    print(f"  有缓存: {cached_calls:>5} 次调用, {cached * 1000 / pokes:6.2f} ms/次")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
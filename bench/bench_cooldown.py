@@ -0,0 +1,43 @@
+"""
+Cooldown 基准：大量不同用户连续戳 bot 时的吞吐与内存占用
+
+用法（在插件根目录下）：
+    python bench/bench_cooldown.py [用户数]
+"""
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.cooldown import Cooldown  # noqa: E402
+
+
+def main(total: int = 2_000_000, rate: int = 5_000, cd: int = 10) -> None:
+    cooldown = Cooldown(SimpleNamespace(poke_cd=cd))  # type: ignore[arg-type]
+
+    # 虚拟时钟：每秒 rate 个不同用户戳 bot
+    now = 0.0
+    cooldown._clock = lambda: now
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(total):
+        now = i / rate
+        cooldown.allow(i % 1000, i)
+        if i and i % (total // 10) == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            print(f"{i:>10} 次  live={cooldown.live:>7}  mem={current / 1024:>8.0f} KiB")
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"总计 {total} 次, {total / elapsed:,.0f} ops/s, 峰值内存 {peak / 1024:.0f} KiB")
+    print(cooldown.stats())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
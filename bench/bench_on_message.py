@@ -0,0 +1,194 @@
+"""
+on_message 预过滤基准：每条消息在判定“不是戳一戳、没唤醒 bot”之前的开销
+
+模拟 10 万条/秒的群聊流量（99% 普通群消息，1% 通知，其中一半是戳一戳），
+对比原先“先 get_extra、再构造完整 PokeEvent 数据类”的判定方式与现在的原地预过滤。
+
+用法（在插件根目录下）：
+    python bench/bench_on_message.py [消息数]
+"""
+
+import asyncio
+import random
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.model import PokeEvent  # noqa: E402
+from core.speakers import RecentSpeakers  # noqa: E402
+
+RATE = 100_000  # 条/秒
+
+
+@dataclass
+class _LegacyPokeEvent:
+    """原先的 PokeEvent：每次判定都复制全部字段"""
+
+    time: int
+    self_id: int
+    user_id: int
+    target_id: int
+    group_id: int | None
+    post_type: str
+    notice_type: str
+    sub_type: str
+    raw_info: list[dict[str, Any]]
+
+    @classmethod
+    def from_event(cls, event):
+        msg = getattr(event, "message_obj", None)
+        raw = getattr(msg, "raw_message", None) if msg else None
+        if not isinstance(raw, dict):
+            return None
+        if raw.get("post_type") != "notice":
+            return None
+        if raw.get("notice_type") != "notify":
+            return None
+        if raw.get("sub_type") != "poke":
+            return None
+        return cls(
+            time=raw.get("time", 0),
+            self_id=raw.get("self_id", 0),
+            user_id=raw.get("user_id", 0),
+            target_id=raw.get("target_id", 0),
+            group_id=raw.get("group_id"),
+            post_type=raw.get("post_type", ""),
+            notice_type=raw.get("notice_type", ""),
+            sub_type=raw.get("sub_type", ""),
+            raw_info=raw.get("raw_info", []),
+        )
+
+
+class _Event:
+    """只实现预过滤会用到的 AiocqhttpMessageEvent 接口"""
+
+    __slots__ = ("message_obj", "is_at_or_wake_command", "_extras")
+
+    def __init__(self, raw: dict):
+        self.message_obj = SimpleNamespace(raw_message=raw)
+        self.is_at_or_wake_command = False
+        self._extras: dict = {}
+
+    def get_extra(self, key=None):
+        return self._extras.get(key) if key else self._extras
+
+
+def _traffic(n: int) -> list[_Event]:
+    rng = random.Random(0)
+    events = []
+    for _ in range(n):
+        gid, uid = rng.randint(1, 300), rng.randint(10**6, 10**10)
+        r = rng.random()
+        if r < 0.005:
+            raw = {
+                "post_type": "notice",
+                "notice_type": "notify",
+                "sub_type": "poke",
+                "self_id": 1959676873,
+                "user_id": uid,
+                "target_id": rng.choice((1959676873, uid + 1)),
+                "group_id": gid,
+                "raw_info": [{"type": "qq"}, {"type": "img"}, {"type": "nor"}],
+            }
+        elif r < 0.01:
+            raw = {"post_type": "notice", "notice_type": "group_card", "group_id": gid}
+        else:
+            raw = {
+                "post_type": "message",
+                "message_type": "group",
+                "group_id": gid,
+                "user_id": uid,
+                "raw_message": "hello",
+            }
+        events.append(_Event(raw))
+    return events
+
+
+async def _legacy_handle(event: _Event):
+    """原 GetPokeHandler.handle 的判定部分"""
+    if event.get_extra("is_poked"):
+        return
+    evt = _LegacyPokeEvent.from_event(event)
+    if not evt:
+        return
+    yield evt
+
+
+async def _handle(event: _Event):
+    """现 GetPokeHandler.handle 的判定部分"""
+    evt = PokeEvent.from_event(event)
+    if not evt:
+        return
+    if event.get_extra("is_poked"):
+        return
+    yield evt
+
+
+async def legacy(events: list[_Event], speakers: RecentSpeakers) -> int:
+    """原流程：每条消息都创建并驱动一次 handle 异步生成器"""
+    polls = 0
+    for event in events:
+        raw = event.message_obj.raw_message
+        if isinstance(raw, dict):
+            post_type = raw.get("post_type")
+            if post_type == "message" and raw.get("message_type") == "group":
+                speakers.record(int(raw["group_id"]), int(raw["user_id"]))
+        async for _ in _legacy_handle(event):
+            polls += 1
+        if event.is_at_or_wake_command:
+            pass
+    return polls
+
+
+async def prefilter(events: list[_Event], speakers: RecentSpeakers) -> int:
+    """现流程：原地看 post_type，只有戳一戳通知才进入 handle"""
+    polls = 0
+    for event in events:
+        raw = event.message_obj.raw_message
+        if not isinstance(raw, dict):
+            raw = {}
+        post_type = raw.get("post_type")
+        if post_type == "notice":
+            if PokeEvent.is_poke(raw):
+                async for _ in _handle(event):
+                    polls += 1
+            continue
+        if post_type == "message" and raw.get("message_type") == "group":
+            speakers.record(int(raw["group_id"]), int(raw["user_id"]))
+        if not event.is_at_or_wake_command:
+            continue
+    return polls
+
+
+def _bench(func, events: list[_Event], rounds: int = 5) -> float:
+    """返回每条消息的平均耗时（纳秒），取多轮最快"""
+    best = float("inf")
+    for _ in range(rounds):
+        speakers = RecentSpeakers()
+        start = time.perf_counter()
+        asyncio.run(func(events, speakers))
+        best = min(best, time.perf_counter() - start)
+    return best / len(events) * 1e9
+
+
+def main(n: int = 100_000) -> None:
+    events = _traffic(n)
+    assert asyncio.run(legacy(events, RecentSpeakers())) == asyncio.run(
+        prefilter(events, RecentSpeakers())
+    )
+
+    print(f"{n} 条消息（约 {n / RATE:.1f} 秒的 {RATE:,} 条/秒流量）")
+    for name, func in (("原流程", legacy), ("预过滤", prefilter)):
+        ns = _bench(func, events)
+        print(
+            f"{name}：{ns:7.0f} ns/条，{RATE:,} 条/秒时占用 {ns * RATE / 1e9:6.1%} 单核"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
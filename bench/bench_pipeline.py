@@ -0,0 +1,138 @@
+"""
+流水线发戳基准：连续发 N 次戳时，逐个等回执与按时隙流水线发送的总耗时对比
+
+起一个本地反向 WebSocket 的 CQHttp，再用 websockets 模拟 OneBot 实现端连上来：
+每个动作在 RTT 秒后按 echo 回执，可按比例回失败。需在 AstrBot 环境中运行：
+    python bench/bench_pipeline.py [戳的次数] [RTT 秒] [发戳间隔 秒]
+
+依赖见 bench/requirements.txt（pip install -r bench/requirements.txt）；
+缺少 websockets 时改用进程内的假 client（group_poke 直接 sleep RTT）。
+"""
+
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiocqhttp import CQHttp  # noqa: E402
+
+from core.send_poke import PokeSender  # noqa: E402
+
+SELF_ID = 10001
+GROUP_ID = 20002
+PORT = 18765
+
+
+class FakeOneBot:
+    """模拟 OneBot 实现端：以反向 WebSocket 连接 bot，延迟 rtt 秒回执"""
+
+    def __init__(self, rtt: float, fail_ratio: float = 0.0):
+        self.rtt = rtt
+        self.fail_ratio = fail_ratio
+        self.calls = 0
+        self._rng = random.Random(0)
+
+    async def run(self, url: str, ready: asyncio.Event) -> None:
+        import websockets
+
+        headers = {"X-Self-ID": str(SELF_ID), "X-Client-Role": "Universal"}
+        async with websockets.connect(url, additional_headers=headers) as ws:
+            ready.set()
+            async for frame in ws:
+                self.calls += 1
+                asyncio.create_task(self._reply(ws, json.loads(frame)))
+
+    async def _reply(self, ws, action: dict) -> None:
+        await asyncio.sleep(self.rtt)
+        ok = self._rng.random() >= self.fail_ratio
+        await ws.send(
+            json.dumps(
+                {
+                    "status": "ok" if ok else "failed",
+                    "retcode": 0 if ok else 100,
+                    "data": None,
+                    "echo": action.get("echo"),
+                }
+            )
+        )
+
+
+class FakeClient:
+    """进程内假 client：每次调用等待 rtt 秒"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.calls = 0
+
+    async def group_poke(self, **_):
+        self.calls += 1
+        await asyncio.sleep(self.rtt)
+
+
+def _config(interval: float, pipeline: bool) -> SimpleNamespace:
+    return SimpleNamespace(
+        snap=SimpleNamespace(
+            poke_interval=interval,
+            poke_account_interval=0.0,
+            poke_pipeline=pipeline,
+            poke_max_inflight=8,
+            # 模拟端按比例回失败，关掉熔断和自适应间隔以免影响对比
+            poke_breaker=SimpleNamespace(enabled=False),
+            poke_pacing=SimpleNamespace(adaptive=False),
+        )
+    )
+
+
+async def _burst(client, n: int, interval: float, pipeline: bool):
+    sender = PokeSender(_config(interval, pipeline))  # type: ignore[arg-type]
+    start = time.perf_counter()
+    ticket = await sender.client_send(
+        client, target_ids=["30003"], group_id=GROUP_ID, times=n, self_id=str(SELF_ID)
+    )
+    elapsed = time.perf_counter() - start
+    await sender.close()
+    return elapsed, ticket
+
+
+async def main(n: int = 20, rtt: float = 0.15, interval: float = 0.05) -> None:
+    try:
+        import websockets  # noqa: F401
+    except ImportError:
+        client, bot_task, onebot_task = FakeClient(rtt), None, None
+        print("未安装 websockets，使用进程内假 client")
+    else:
+        client = CQHttp()
+        bot_task = asyncio.create_task(client.run_task("127.0.0.1", PORT))
+        await asyncio.sleep(0.5)
+        onebot, ready = FakeOneBot(rtt, fail_ratio=0.1), asyncio.Event()
+        onebot_task = asyncio.create_task(
+            onebot.run(f"ws://127.0.0.1:{PORT}/ws/", ready)
+        )
+        await asyncio.wait_for(ready.wait(), 5)
+        await asyncio.sleep(0.1)
+        print("本地反向 WebSocket，OneBot 端按 10% 概率回失败")
+
+    print(f"{n} 次戳，RTT {rtt * 1000:.0f}ms，间隔 {interval * 1000:.0f}ms")
+    # 逐个等待时间隔可以和 RTT 重叠，因此是 max 而不是相加
+    serial, pipelined = n * max(interval, rtt), n * interval + rtt
+    print(f"理论：逐个等待 ≈ {serial:.2f}s，流水线 ≈ {pipelined:.2f}s")
+    for name, pipeline in (("逐个等待", False), ("流水线", True)):
+        elapsed, ticket = await _burst(client, n, interval, pipeline)
+        print(f"{name}：{elapsed:.2f}s，成功 {ticket.sent}，失败 {ticket.failed}")
+
+    for task in (onebot_task, bot_task):
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    args = [float(a) for a in sys.argv[1:4]]
+    if args:
+        args[0] = int(args[0])
+    asyncio.run(main(*args))  # type: ignore[arg-type]
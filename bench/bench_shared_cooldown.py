@@ -0,0 +1,123 @@
+"""
+共享冷却多进程基准：多个进程同时被同一批用户戳，验证每个用户只被放行一次
+
+起 P 个进程，各自打开同一个冷却文件，在同一时刻对同一批 (群, 用户) 各调用一次 allow，
+然后再连戳若干轮（全部应在冷却中被拒绝）。对比各进程独立的内存冷却：
+内存冷却每个用户会被放行 P 次，共享冷却只放行 1 次。
+
+开跑前先自检：模拟写者在两次序号递增之间崩溃（槽位序号停在奇数），
+allow() 须在限定时间内返回并修复该槽位，而不是一直自旋。
+
+用法（在插件根目录下，仅 Linux/macOS）：
+    python bench/bench_shared_cooldown.py [进程数] [用户数] [连戳轮数]
+"""
+
+import multiprocessing as mp
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.cooldown import Cooldown  # noqa: E402
+from core.shared_cooldown import (  # noqa: E402
+    _HEADER_SIZE,
+    _SEQ,
+    _SLOT,
+    SharedCooldown,
+)
+
+CONFIG = SimpleNamespace(poke_cd=60)
+
+
+def _keys(n: int, seed: int) -> list[tuple[int, int]]:
+    rng = random.Random(0)
+    keys = [(rng.randint(1, 500), rng.randint(10**6, 10**10)) for _ in range(n)]
+    # 各进程打乱顺序，制造同一键的并发竞争
+    random.Random(seed).shuffle(keys)
+    return keys
+
+
+def _worker(backend: str, path: str, n: int, rounds: int, seed: int, barrier, out):
+    if backend == "mmap":
+        cooldown = SharedCooldown(CONFIG, Path(path))  # type: ignore[arg-type]
+    else:
+        cooldown = Cooldown(CONFIG)  # type: ignore[arg-type]
+    keys = _keys(n, seed)
+    barrier.wait()
+
+    start = time.perf_counter()
+    allowed = sum(cooldown.allow(gid, uid) for gid, uid in keys)
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for gid, uid in keys:
+            allowed += cooldown.allow(gid, uid)
+    spam = time.perf_counter() - start
+    out.put((allowed, first / n, spam / max(1, n * rounds)))
+
+
+def _stuck_slot(path: str, gid: int, uid: int) -> None:
+    cooldown = SharedCooldown(CONFIG, Path(path))  # type: ignore[arg-type]
+    # 写者崩溃：该键探测窗口的第一个槽位序号停在奇数
+    off = _HEADER_SIZE + cooldown._home(gid, uid) * _SLOT.size
+    _SEQ.pack_into(cooldown._mm, off, 7)
+    assert cooldown.allow(gid, uid)
+    assert not cooldown.allow(gid, uid)
+    assert cooldown.repairs == 1 and not _SEQ.unpack_from(cooldown._mm, off)[0] & 1
+    cooldown.close()
+
+
+def check_stuck_writer(timeout: float = 10.0) -> None:
+    """序号停在奇数的槽位不能让 allow() 卡死"""
+    path = Path(tempfile.mkdtemp()) / "cooldown.mmap"
+    proc = mp.Process(target=_stuck_slot, args=(str(path), 123, 456))
+    proc.start()
+    proc.join(timeout)
+    if proc.is_alive():
+        proc.kill()
+        raise SystemExit(f"自检失败：allow() 在 {timeout:g}s 内未返回")
+    if proc.exitcode:
+        raise SystemExit("自检失败：卡住的槽位未被修复")
+    print("自检通过：崩溃写者留下的槽位已修复")
+
+
+def run(backend: str, procs: int, n: int, rounds: int) -> None:
+    path = Path(tempfile.mkdtemp()) / "cooldown.mmap"
+    if backend == "mmap":
+        SharedCooldown(CONFIG, path).close()  # type: ignore[arg-type]
+    barrier, out = mp.Barrier(procs), mp.Queue()
+    workers = [
+        mp.Process(
+            target=_worker, args=(backend, str(path), n, rounds, seed, barrier, out)
+        )
+        for seed in range(procs)
+    ]
+    for w in workers:
+        w.start()
+    results = [out.get() for _ in workers]
+    for w in workers:
+        w.join()
+
+    allowed = sum(r[0] for r in results)
+    first_us = max(r[1] for r in results) * 1e6
+    spam_us = max(r[2] for r in results) * 1e6
+    print(
+        f"{backend:6}：放行 {allowed:6d} 次（每用户 {allowed / n:.2f} 次），"
+        f"首戳 {first_us:5.2f} µs/次，冷却中连戳 {spam_us:5.2f} µs/次"
+    )
+
+
+def main(procs: int = 4, n: int = 20_000, rounds: int = 5) -> None:
+    check_stuck_writer()
+    print(f"{procs} 个进程，{n} 个用户同时戳一次，再连戳 {rounds} 轮")
+    for backend in ("memory", "mmap"):
+        run(backend, procs, n, rounds)
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:4]))
@@ -0,0 +1,640 @@
+"""
+热路径微基准套件：离线运行，结果写入 JSON，便于在版本之间对比
+
+用法（在插件根目录下）：
+    python bench/run.py                         # 运行全部用例
+    python bench/run.py -k cooldown             # 只运行名称含 cooldown 的用例
+    python bench/run.py -o base.json            # 指定结果文件
+    python bench/run.py --compare base.json     # 与之前的结果对比，变慢超过阈值时退出码为 1
+
+缺少 AstrBot 时装入最小的 astrbot 桩模块（只含被测代码导入的名字），
+配置节点、get_ats 等用例照常运行，结果的 meta.astrbot 记为 "stub"。
+"""
+
+import argparse
+import json
+import logging
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from types import ModuleType, SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# 用例：名称 → (准备函数, 依赖的模块)；准备函数返回 (被测函数, 每次调用的操作数)
+Setup = Callable[[], tuple[Callable[[], object], int]]
+CASES: dict[str, tuple[Setup, tuple[str, ...]]] = {}
+
+
+def case(name: str, requires: tuple[str, ...] = ()):
+    def register(setup: Setup) -> Setup:
+        CASES[name] = (setup, requires)
+        return setup
+
+    return register
+
+
+def _missing(modules: tuple[str, ...]) -> str | None:
+    for module in modules:
+        try:
+            __import__(module)
+        except ImportError:
+            return module
+    return None
+
+
+def _stub_astrbot() -> str:
+    """未安装 AstrBot 时装入最小桩模块，返回 "real" / "stub" """
+    try:
+        import astrbot  # noqa: F401
+
+        return "real"
+    except ImportError:
+        pass
+
+    def module(name: str, **attrs) -> ModuleType:
+        mod = sys.modules.setdefault(name, ModuleType(name))
+        mod.__dict__.update(attrs)
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(module(parent), child, mod)
+        return mod
+
+    class Component:
+        def __init__(self, **kwargs):
+            self.__dict__.update(kwargs)
+
+    class AstrBotConfig(dict):
+        def save_config(self) -> None:
+            pass
+
+    data = Path(tempfile.gettempdir()) / "pokepro-bench"
+    module("astrbot.api", logger=logging.getLogger("pokepro-bench"))
+    module("astrbot.core.config.astrbot_config", AstrBotConfig=AstrBotConfig)
+    module("astrbot.core.star.context", Context=object)
+    module(
+        "astrbot.core.message.components",
+        At=type("At", (Component,), {}),
+        Plain=type("Plain", (Component,), {}),
+    )
+    module(
+        "astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event",
+        AiocqhttpMessageEvent=object,
+    )
+    module(
+        "astrbot.core.utils.astrbot_path",
+        get_astrbot_root=lambda: str(data),
+        get_astrbot_plugin_path=lambda: str(data / "plugins"),
+        get_astrbot_plugin_data_path=lambda: str(data / "plugin_data"),
+    )
+    module(
+        "astrbot.core.utils.image_ref_utils",
+        ALLOWED_IMAGE_EXTENSIONS={".png", ".jpg", ".jpeg", ".gif", ".webp"},
+    )
+    return "stub"
+
+
+ASTRBOT = _stub_astrbot()
+
+
+# ================= 测试数据 =================
+
+_RNG = random.Random(0)
+_CHARS = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工"
+
+
+def _poke_notice(group_id: int, user_id: int, target_id: int) -> dict:
+    """NapCat 上报的群戳一戳通知"""
+    return {
+        "time": 1770684953,
+        "self_id": 1959676873,
+        "post_type": "notice",
+        "notice_type": "notify",
+        "sub_type": "poke",
+        "target_id": target_id,
+        "user_id": user_id,
+        "group_id": group_id,
+        "raw_info": [
+            {"col": "1", "nm": "", "type": "qq", "uid": "u_QmVcCfvoEUKZv6rb2WM7Lw"},
+            {
+                "jp": "https://zb.vip.qq.com/v2/pages/nudgeMall?_wv=2&actionId=0",
+                "src": "http://tianquan.gtimg.cn/nudgeeffect/item/5/client.gif",
+                "type": "img",
+            },
+            {"col": "1", "nm": "", "tp": "0", "type": "qq", "uid": "u_4Twr4XaJ"},
+            {"txt": "的服务器", "type": "nor"},
+        ],
+    }
+
+
+def _group_message(group_id: int, user_id: int) -> dict:
+    return {
+        "time": 1770684953,
+        "self_id": 1959676873,
+        "post_type": "message",
+        "message_type": "group",
+        "sub_type": "normal",
+        "group_id": group_id,
+        "user_id": user_id,
+        "message": [{"type": "text", "data": {"text": "hello"}}],
+        "raw_message": "hello",
+    }
+
+
+def _wrap(raw: dict) -> SimpleNamespace:
+    return SimpleNamespace(message_obj=SimpleNamespace(raw_message=raw))
+
+
+def _texts(n: int, length: int = 40) -> list[str]:
+    return ["".join(_RNG.choices(_CHARS, k=length)) for _ in range(n)]
+
+
+def _keywords(n: int) -> list[str]:
+    return list({"".join(_RNG.choices(_CHARS, k=_RNG.randint(2, 4))) for _ in range(n)})
+
+
+# ================= 用例 =================
+
+
+@case("from_event.poke")
+def _from_event_poke():
+    from core.model import PokeEvent
+
+    events = [
+        _wrap(_poke_notice(_RNG.randint(1, 500), _RNG.randint(1, 10**9), 1959676873))
+        for _ in range(1000)
+    ]
+
+    def run():
+        for e in events:
+            PokeEvent.from_event(e)
+
+    return run, len(events)
+
+
+@case("from_event.message")
+def _from_event_message():
+    """非戳一戳消息（绝大多数流量）被拒绝的开销"""
+    from core.model import PokeEvent
+
+    events = [
+        _wrap(_group_message(_RNG.randint(1, 500), _RNG.randint(1, 10**9)))
+        for _ in range(1000)
+    ]
+
+    def run():
+        for e in events:
+            PokeEvent.from_event(e)
+
+    return run, len(events)
+
+
+@case("cooldown.allow")
+def _cooldown_allow():
+    """百万级 (群, 用户) 键空间，每秒 5000 次触发"""
+    from core.cooldown import Cooldown
+
+    cooldown = Cooldown(SimpleNamespace(poke_cd=10))  # type: ignore[arg-type]
+    clock = [0.0]
+    cooldown._clock = lambda: clock[0]
+    keys = [(_RNG.randint(1, 1000), _RNG.randint(1, 1_000_000)) for _ in range(10_000)]
+
+    def run():
+        for gid, uid in keys:
+            clock[0] += 0.0002
+            cooldown.allow(gid, uid)
+
+    return run, len(keys)
+
+
+@case("cooldown.shared.allow", requires=("fcntl",))
+def _shared_cooldown_allow():
+    """同 cooldown.allow，换成内存映射文件的共享冷却"""
+    from core.shared_cooldown import SharedCooldown
+
+    path = Path(tempfile.mkdtemp()) / "cooldown.mmap"
+    cooldown = SharedCooldown(SimpleNamespace(poke_cd=10), path)  # type: ignore[arg-type]
+    clock = [0.0]
+    cooldown._clock = lambda: clock[0]
+    keys = [(_RNG.randint(1, 1000), _RNG.randint(1, 1_000_000)) for _ in range(10_000)]
+
+    def run():
+        for gid, uid in keys:
+            clock[0] += 0.0002
+            cooldown.allow(gid, uid)
+
+    return run, len(keys)
+
+
+@case("keywords.matcher")
+def _keywords_matcher():
+    """1000 个关键词，命中与未命中混合"""
+    from core.matcher import KeywordMatcher
+
+    matcher = KeywordMatcher(_keywords(1000))
+    texts = _texts(500)
+
+    def run():
+        for text in texts:
+            matcher.search(text)
+
+    return run, len(texts)
+
+
+@case("keywords.hit_poke_keywords")
+def _hit_poke_keywords():
+    from core.config import PluginConfig
+    from core.matcher import KeywordMatcher
+
+    cfg = SimpleNamespace(keyword_matcher=KeywordMatcher(_keywords(1000)))
+    texts = _texts(500)
+    hit = PluginConfig.hit_poke_keywords
+
+    def run():
+        for text in texts:
+            hit(cfg, text)  # type: ignore[arg-type]
+
+    return run, len(texts)
+
+
+def _config_root():
+    from core.config import ConfigNode, LLMConfig
+
+    class Root(ConfigNode):
+        poke_cd: int
+        follow_prob: float
+        llm: LLMConfig
+
+    return Root(
+        {
+            "poke_cd": 10,
+            "follow_prob": 0.1,
+            "llm": {"weight": 10, "template": "{username}", "pool_size": 0},
+        }
+    )
+
+
+@case("config.getattr")
+def _config_getattr():
+    """热路径上的配置读取：顶层字段 + 嵌套节点字段（经 ConfigNode.__getattr__）"""
+    root = _config_root()
+
+    def run():
+        for _ in range(1000):
+            root.poke_cd
+            root.follow_prob
+            root.llm.weight
+
+    return run, 3000
+
+
+@case("config.snapshot")
+def _config_snapshot():
+    """同上，改读 freeze() 出的只读快照"""
+    snap = _config_root().freeze()
+
+    def run():
+        for _ in range(1000):
+            snap.poke_cd
+            snap.follow_prob
+            snap.llm.weight
+
+    return run, 3000
+
+
+def _weights_config():
+    from core.config import (
+        AntiPokeConfig,
+        BanConfig,
+        CommandConfig,
+        ConfigNode,
+        FaceConfig,
+        LLMConfig,
+        MemeConfig,
+        RecordConfig,
+    )
+
+    class Root(ConfigNode):
+        antipoke: AntiPokeConfig
+        llm: LLMConfig
+        face: FaceConfig
+        meme: MemeConfig
+        record: RecordConfig
+        ban: BanConfig
+        command: CommandConfig
+
+    nodes = {
+        "antipoke": AntiPokeConfig,
+        "llm": LLMConfig,
+        "face": FaceConfig,
+        "meme": MemeConfig,
+        "record": RecordConfig,
+        "ban": BanConfig,
+        "command": CommandConfig,
+    }
+    return Root(
+        {
+            name: {field: 10 if field == "weight" else None for field in tp._fields()}
+            for name, tp in nodes.items()
+        }
+    )
+
+
+@case("config.weight_of.node")
+def _weight_of_node():
+    """原 weight_of：每次调用经配置节点重建整张权重字典"""
+    from core.model import PokeModel
+
+    cfg = _weights_config()
+
+    def weight_of(module):
+        return {
+            PokeModel.ANTIPOKE: cfg.antipoke.weight,
+            PokeModel.LLM: cfg.llm.weight,
+            PokeModel.FACE: cfg.face.weight,
+            PokeModel.MEME: cfg.meme.weight,
+            PokeModel.RECORD: cfg.record.weight,
+            PokeModel.BAN: cfg.ban.weight,
+            PokeModel.COMMAND: cfg.command.weight,
+        }[module]
+
+    modules = list(PokeModel) * 100
+
+    def run():
+        for module in modules:
+            weight_of(module)
+
+    return run, len(modules)
+
+
+@case("config.weight_of.snapshot")
+def _weight_of_snapshot():
+    """现 weight_of：查快照里编译好的权重表"""
+    from types import MappingProxyType
+
+    from core.config import PluginConfig
+    from core.model import PokeModel
+
+    cfg = SimpleNamespace(
+        snap=_weights_config().freeze(
+            weights=MappingProxyType({m: 10 for m in PokeModel})
+        )
+    )
+    weight_of = PluginConfig.weight_of
+    modules = list(PokeModel) * 100
+
+    def run():
+        for module in modules:
+            weight_of(cfg, module)  # type: ignore[arg-type]
+
+    return run, len(modules)
+
+
+@case("utils.get_ats", requires=("aiocqhttp",))
+def _get_ats():
+    from astrbot.core.message.components import At, Plain
+
+    from core.utils import get_ats
+
+    class Event:
+        def __init__(self, segs, text):
+            self._segs = segs
+            self.message_str = text
+
+        def get_messages(self):
+            return self._segs
+
+        def get_self_id(self):
+            return "1959676873"
+
+    events = []
+    for _ in range(500):
+        ids = [str(_RNG.randint(10**6, 10**10)) for _ in range(_RNG.randint(0, 3))]
+        segs = [Plain(text="戳")] + [At(qq=i) for i in ids] + [Plain(text=" 3")]
+        events.append(Event(segs, "戳 " + " ".join(f"@{i}" for i in ids) + " 3"))
+
+    def run():
+        for e in events:
+            get_ats(e, noself=True)  # type: ignore[arg-type]
+
+    return run, len(events)
+
+
+@case("policy.pick")
+def _policy_pick():
+    """按群权重覆盖 + 全局权重表抽取响应模块"""
+    from core.model import PokeModel
+    from core.policy import ResponsePolicy
+
+    weights = {m: _RNG.randint(0, 20) for m in PokeModel}
+    groups = {gid: {PokeModel.LLM: 0, PokeModel.BAN: 30} for gid in range(0, 200, 2)}
+    policy = ResponsePolicy(weights, groups, {PokeModel.FACE, PokeModel.ANTIPOKE})
+    gids = [_RNG.randint(1, 200) for _ in range(1000)]
+
+    def run():
+        for gid in gids:
+            policy.pick(gid)
+
+    return run, len(gids)
+
+
+def _meme_tree(base: Path, dirs: int = 40, files: int = 100) -> Path:
+    root = base / "gallery"
+    for d in range(dirs):
+        sub = root / f"d{d // 8}" / f"s{d}"
+        sub.mkdir(parents=True, exist_ok=True)
+        for f in range(files):
+            ext = ".png" if f % 5 else ".txt"
+            (sub / f"{f}{ext}").write_bytes(b"x")
+    return root
+
+
+def _meme_case(scan: bool, via_config: bool):
+    from core.meme_index import MemeIndex
+
+    base = Path(tempfile.mkdtemp(prefix="pokepro-bench-"))
+    root = _meme_tree(base)
+    index = MemeIndex(base / "index.db", {".png", ".jpg", ".gif"})
+    index.scan([root])
+
+    if via_config:
+        from core.config import PluginConfig
+
+        cfg = SimpleNamespace(
+            meme=SimpleNamespace(pool=[], paths=[str(root)]),
+            meme_index=index,
+            _resolve_meme_search_path=lambda p: Path(p),
+        )
+
+        def collect():
+            PluginConfig._collect_meme_images(cfg, scan=scan)  # type: ignore[arg-type]
+
+    elif scan:
+
+        def collect():
+            index.scan([root])
+
+    else:
+
+        def collect():
+            index.load([root])
+
+    collect.cleanup = lambda: shutil.rmtree(base, ignore_errors=True)  # type: ignore[attr-defined]
+    return collect, 1
+
+
+@case("meme.index_load")
+def _meme_load():
+    """启动路径：直接读索引（40 个目录 × 80 张图）"""
+    return _meme_case(scan=False, via_config=False)
+
+
+@case("meme.index_rescan")
+def _meme_rescan():
+    """后台路径：目录未变化时的增量扫描"""
+    return _meme_case(scan=True, via_config=False)
+
+
+@case("meme.collect_meme_images")
+def _meme_collect():
+    return _meme_case(scan=False, via_config=True)
+
+
+# ================= 运行与对比 =================
+
+
+def measure(func: Callable[[], object], ops: int, min_time: float, rounds: int) -> dict:
+    """自动确定每轮调用次数，取多轮中最快的一轮"""
+    func()  # 预热
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / rounds or loops >= 1 << 20:
+            break
+        loops *= 2
+
+    best = elapsed
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, time.perf_counter() - start)
+
+    per_op = best / (loops * ops)
+    return {
+        "ns_per_op": round(per_op * 1e9, 1),
+        "ops_per_sec": round(1 / per_op) if per_op else None,
+        "loops": loops,
+        "ops_per_loop": ops,
+        "rounds": rounds,
+    }
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def run_all(pattern: str, min_time: float, rounds: int) -> dict:
+    results: dict[str, dict] = {}
+    for name, (setup, requires) in CASES.items():
+        if pattern and pattern not in name:
+            continue
+        missing = _missing(requires)
+        if missing:
+            results[name] = {"skipped": f"缺少依赖 {missing}"}
+            print(f"{name:<32} skipped（缺少 {missing}）")
+            continue
+        _RNG.seed(0)  # 每个用例的数据与是否筛选无关
+        func, ops = setup()
+        try:
+            result = measure(func, ops, min_time, rounds)
+        finally:
+            cleanup = getattr(func, "cleanup", None)
+            if cleanup:
+                cleanup()
+        results[name] = result
+        print(f"{name:<32} {result['ns_per_op']:>12,.1f} ns/op")
+    return {
+        "meta": {
+            "rev": _git_rev(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "astrbot": ASTRBOT,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(base: dict, current: dict, threshold: float) -> bool:
+    """打印与基线的对比，返回是否有用例变慢超过阈值"""
+    regressed = False
+    print(f"\n对比基线 {base['meta'].get('rev')} → {current['meta'].get('rev')}")
+    for name, cur in current["results"].items():
+        old = base["results"].get(name)
+        if not old or "ns_per_op" not in old or "ns_per_op" not in cur:
+            continue
+        ratio = cur["ns_per_op"] / old["ns_per_op"] if old["ns_per_op"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- 变慢"
+            regressed = True
+        elif ratio < 1 - threshold:
+            flag = "  (变快)"
+        print(
+            f"{name:<32} {old['ns_per_op']:>10,.1f} → {cur['ns_per_op']:>10,.1f}"
+            f" ns/op  x{ratio:.2f}{flag}"
+        )
+    return regressed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="pokepro 热路径微基准")
+    parser.add_argument("-k", "--filter", default="", help="只运行名称含该子串的用例")
+    parser.add_argument("-o", "--output", type=Path, help="结果 JSON 路径")
+    parser.add_argument("--compare", type=Path, help="作为基线对比的结果 JSON")
+    parser.add_argument(
+        "--threshold", type=float, default=0.15, help="判定变慢的比例"
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=1.0, help="每个用例的最短总耗时（秒）"
+    )
+    parser.add_argument("--rounds", type=int, default=5, help="每个用例的轮数")
+    args = parser.parse_args()
+
+    report = run_all(args.filter, args.min_time, max(1, args.rounds))
+
+    output = args.output or ROOT / "bench" / "results" / f"{report['meta']['rev']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n结果已写入 {output}")
+
+    if args.compare:
+        base = json.loads(args.compare.read_text(encoding="utf-8"))
+        if compare(base, report, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
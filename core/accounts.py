@@ -0,0 +1,104 @@
+# core/accounts.py
+from __future__ import annotations
+
+import itertools
+import time
+
+from aiocqhttp import CQHttp
+
+from astrbot.api import logger
+
+from .cache import SingleFlight
+from .send_poke import PokeSender
+
+
+class AccountRouter:
+    """
+    多账号路由
+
+    - 从经过的消息中按 self_id 记录各账号的 client
+    - 记录每个账号所在的群（get_group_list 定期刷新 + 消息/进退群通知增量维护）
+    - 为指定群挑选待发戳最少的可用账号，或把一批目标分摊到多个可用账号
+    """
+
+    def __init__(self, sender: PokeSender, group_ttl: float = 3600.0):
+        self.sender = sender
+        self.group_ttl = group_ttl
+        self._clients: dict[str, CQHttp] = {}
+        self._groups: dict[str, set[int]] = {}
+        self._loaded_at: dict[str, float] = {}
+        self._flight: SingleFlight[str, None] = SingleFlight()
+        self._rr = itertools.count()
+        self._clock = time.monotonic
+
+    @property
+    def accounts(self) -> list[str]:
+        return list(self._clients)
+
+    def observe(self, self_id: str, client: CQHttp, group_id: int | None) -> None:
+        """记录消息所属账号及其所在群（每条消息都会调用，已知时不做任何分配）"""
+        if self._clients.get(self_id) is not client:
+            self._clients[self_id] = client
+            self._groups.setdefault(self_id, set())
+        if group_id:
+            self._groups[self_id].add(int(group_id))
+
+    def on_group_change(
+        self, self_id: int | str, group_id: int | str, joined: bool
+    ) -> None:
+        """账号自己进群/退群"""
+        groups = self._groups.get(str(self_id))
+        if groups is None:
+            return
+        if joined:
+            groups.add(int(group_id))
+        else:
+            groups.discard(int(group_id))
+            self.sender.forget_group(self_id, group_id)
+
+    async def _refresh(self, self_id: str) -> None:
+        client = self._clients[self_id]
+        try:
+            groups = await client.get_group_list(self_id=int(self_id))
+        except Exception as e:
+            logger.warning(f"获取账号 {self_id} 的群列表失败：{e}")
+            # 失败也记录时间，避免每次路由都重试
+            self._loaded_at[self_id] = self._clock()
+            return
+        self._groups[self_id] = {int(g["group_id"]) for g in groups or []}
+        self._loaded_at[self_id] = self._clock()
+
+    async def eligible(self, group_id: int | str) -> list[str]:
+        """在该群里的所有账号"""
+        gid = int(group_id)
+        now = self._clock()
+        for self_id in list(self._clients):
+            if now - self._loaded_at.get(self_id, float("-inf")) >= self.group_ttl:
+                await self._flight.do(self_id, lambda s=self_id: self._refresh(s))
+        return [s for s in self._clients if gid in self._groups.get(s, ())]
+
+    async def pick(self, group_id: int | str) -> tuple[str, CQHttp] | None:
+        """挑选该群里待发戳最少的账号"""
+        candidates = await self.eligible(group_id)
+        if not candidates:
+            return None
+        # 负载相同时轮询
+        start = next(self._rr) % len(candidates)
+        rotated = candidates[start:] + candidates[:start]
+        self_id = min(rotated, key=self.sender.pending)
+        return self_id, self._clients[self_id]
+
+    async def split(
+        self, group_id: int | str, target_ids: list[str]
+    ) -> list[tuple[str, CQHttp, list[str]]]:
+        """把一批目标按轮询分摊给该群里的所有账号"""
+        candidates = await self.eligible(group_id)
+        if not candidates:
+            return []
+        chunks: dict[str, list[str]] = {s: [] for s in candidates}
+        for i, tid in enumerate(target_ids):
+            chunks[candidates[i % len(candidates)]].append(tid)
+        return [(s, self._clients[s], tids) for s, tids in chunks.items() if tids]
+
+    def stats(self) -> dict[str, int]:
+        return {s: len(self._groups.get(s, ())) for s in self._clients}
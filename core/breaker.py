@@ -0,0 +1,129 @@
+# core/breaker.py
+from __future__ import annotations
+
+import time
+from enum import IntEnum
+
+from aiocqhttp.exceptions import ActionFailed
+
+# OneBot 参数错误返回码：只与本次目标有关，不计入熔断
+_RETCODE_BAD_PARAMS = frozenset({100, 102})
+
+
+def counts_as_failure(exc: BaseException) -> bool:
+    """
+    发戳异常是否说明该群/账号暂时不可用（计入熔断）
+
+    - 目标 ID 非法、OneBot 参数错误：只是这一戳的问题，不计入
+    - 其余（操作失败、风控、群禁用戳一戳、网络超时、接口不可用等）：计入
+    """
+    if isinstance(exc, ValueError):
+        return False
+    if isinstance(exc, ActionFailed):
+        return exc.result.get("retcode") not in _RETCODE_BAD_PARAMS
+    return True
+
+
+class BreakerState(IntEnum):
+    CLOSED = 0  # 正常发送
+    OPEN = 1  # 熔断中，直接判失败
+    HALF_OPEN = 2  # 退避结束，放一次探测
+
+    def __str__(self) -> str:
+        return self.name.lower()
+
+
+class CircuitBreaker:
+    """
+    单个 (账号, 群) 的发戳熔断器
+
+    - 连续 threshold 次计入熔断的失败后打开，退避 backoff 秒内直接判失败
+    - 退避结束后半开，只放行一次探测：成功则关闭并重置退避，
+      失败则重新打开且退避翻倍（不超过 max_backoff）
+    """
+
+    __slots__ = (
+        "threshold",
+        "backoff",
+        "max_backoff",
+        "state",
+        "failures",
+        "retry_at",
+        "used_at",
+        "trips",
+        "rejected",
+        "_delay",
+        "_probing",
+        "_clock",
+    )
+
+    def __init__(self, threshold: int, backoff: float, max_backoff: float):
+        self.threshold = max(1, threshold)
+        self.backoff = max(1.0, float(backoff))
+        self.max_backoff = max(self.backoff, float(max_backoff))
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.retry_at = 0.0
+        self._delay = self.backoff
+        self._probing = False
+        self._clock = time.monotonic
+        self.used_at = self._clock()
+
+        # 统计
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def idle(self) -> bool:
+        """关闭且没有累计失败，可以丢弃"""
+        return self.state is BreakerState.CLOSED and not self.failures
+
+    def retry_in(self) -> float:
+        """距离下次探测的秒数"""
+        return max(0.0, self.retry_at - self._clock())
+
+    def rejecting(self) -> bool:
+        """熔断中且未到探测时间（不计数，供入队前判断）"""
+        return self.state is BreakerState.OPEN and self._clock() < self.retry_at
+
+    def allow(self) -> bool:
+        """本次是否放行；半开时只放行一次探测"""
+        self.used_at = self._clock()
+        if self.state is BreakerState.CLOSED:
+            return True
+        if self.state is BreakerState.OPEN:
+            if self._clock() < self.retry_at:
+                self.rejected += 1
+                return False
+            self.state = BreakerState.HALF_OPEN
+            self._probing = False
+        if self._probing:
+            self.rejected += 1
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.used_at = self._clock()
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self._delay = self.backoff
+        self._probing = False
+
+    def record_failure(self, counted: bool = True) -> bool:
+        """记录一次失败，返回是否因此打开了熔断"""
+        self.used_at = self._clock()
+        if not counted:
+            # 探测结果不能说明问题，允许下一戳重新探测
+            self._probing = False
+            return False
+        self.failures += 1
+        if self.state is BreakerState.HALF_OPEN:
+            self._delay = min(self._delay * 2, self.max_backoff)
+        elif self.state is BreakerState.OPEN or self.failures < self.threshold:
+            return False
+        self.state = BreakerState.OPEN
+        self.retry_at = self._clock() + self._delay
+        self._probing = False
+        self.trips += 1
+        return True
@@ -0,0 +1,102 @@
+# core/cache.py
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    带过期时间的 LRU 缓存
+
+    - 每个条目有独立过期时间（默认 ttl）
+    - 条目数超出 maxsize 时淘汰最久未访问的条目
+    - get / set / pop 均为 O(1)
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._clock = clock
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        item = self._data.get(key)
+        return item is not None and item[0] > self._clock()
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        if item[0] <= self._clock():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        expire_at = self._clock() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expire_at, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: K) -> V | None:
+        item = self._data.pop(key, None)
+        return item[1] if item else None
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    同 key 并发请求合并：同一时刻同一 key 只执行一次 factory，
+    其余调用方共享结果（或异常）
+    """
+
+    def __init__(self):
+        self._calls: dict[K, asyncio.Future[V]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: K, factory: Callable[[], Awaitable[V]]) -> V:
+        fut = self._calls.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(factory())
+            self._calls[key] = fut
+            fut.add_done_callback(lambda _: self._calls.pop(key, None))
+        # shield：单个调用方被取消时不影响其他等待者
+        return await asyncio.shield(fut)
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import random
+import threading
 from collections.abc import Mapping, MutableMapping
 from pathlib import Path
 from types import MappingProxyType, UnionType
@@ -17,7 +18,39 @@ from astrbot.core.utils.astrbot_path import (
 )
 from astrbot.core.utils.image_ref_utils import ALLOWED_IMAGE_EXTENSIONS
 
-from .model import PokeModel
+from .matcher import KeywordMatcher
+from .meme_index import MemeIndex
+from .model import PokeModel, ScheduleJob
+from .policy import ResponsePolicy, parse_group_weights
+
+# 语音池支持的音频格式
+AUDIO_EXTENSIONS = {
+    ".mp3",
+    ".wav",
+    ".ogg",
+    ".opus",
+    ".flac",
+    ".m4a",
+    ".aac",
+    ".amr",
+    ".silk",
+}
+
+
+class ConfigSnapshot:
+    """配置快照基类：只读、__slots__，字段在冻结时一次性填好"""
+
+    __slots__ = ()
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        raise AttributeError(f"配置快照只读，不能修改 {key}")
+
+    def __delattr__(self, key: str) -> None:
+        raise AttributeError(f"配置快照只读，不能删除 {key}")
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__)
+        return f"{type(self).__name__}({fields})"
 
 
 class ConfigNode:
@@ -29,21 +62,29 @@ class ConfigNode:
     - 声明字段：读写，写回底层 dict
     - 未声明字段和下划线字段：仅挂载属性，不写回
     - 支持 ConfigNode 多层嵌套（lazy + cache）
+    - freeze() 编译出只读快照，供热路径读取
     """
 
     _SCHEMA_CACHE: dict[type, dict[str, type]] = {}
     _FIELDS_CACHE: dict[type, set[str]] = {}
+    _SNAPSHOT_TYPES: dict[tuple[type, tuple[str, ...]], type[ConfigSnapshot]] = {}
 
     @classmethod
     def _schema(cls) -> dict[str, type]:
-        return cls._SCHEMA_CACHE.setdefault(cls, get_type_hints(cls))
+        # 注意不能用 setdefault(cls, get_type_hints(cls))：参数会在每次调用时求值
+        schema = cls._SCHEMA_CACHE.get(cls)
+        if schema is None:
+            schema = cls._SCHEMA_CACHE[cls] = get_type_hints(cls)
+        return schema
 
     @classmethod
     def _fields(cls) -> set[str]:
-        return cls._FIELDS_CACHE.setdefault(
-            cls,
-            {k for k in cls._schema() if not k.startswith("_")},
-        )
+        fields = cls._FIELDS_CACHE.get(cls)
+        if fields is None:
+            fields = cls._FIELDS_CACHE[cls] = {
+                k for k in cls._schema() if not k.startswith("_")
+            }
+        return fields
 
     @staticmethod
     def _is_optional(tp: type) -> bool:
@@ -94,6 +135,33 @@ class ConfigNode:
             return
         object.__setattr__(self, key, value)
 
+    @classmethod
+    def _snapshot_type(cls, extra: tuple[str, ...] = ()) -> type[ConfigSnapshot]:
+        key = (cls, extra)
+        tp = cls._SNAPSHOT_TYPES.get(key)
+        if tp is None:
+            slots = tuple(sorted(cls._fields())) + extra
+            tp = type(f"{cls.__name__}Snapshot", (ConfigSnapshot,), {"__slots__": slots})
+            cls._SNAPSHOT_TYPES[key] = tp
+        return tp
+
+    def freeze(self, **derived: Any) -> Any:
+        """
+        编译当前配置的只读快照：子节点递归冻结，列表转为元组；
+        derived 为附加到快照上的派生值
+        """
+        snap = object.__new__(self._snapshot_type(tuple(derived)))
+        for key in self._fields():
+            value = getattr(self, key)
+            if isinstance(value, ConfigNode):
+                value = value.freeze()
+            elif isinstance(value, list):
+                value = tuple(value)
+            object.__setattr__(snap, key, value)
+        for key, value in derived.items():
+            object.__setattr__(snap, key, value)
+        return snap
+
     def raw_data(self) -> Mapping[str, Any]:
         """
         底层配置 dict 的只读视图
@@ -122,6 +190,7 @@ class AntiPokeConfig(ConfigNode):
 class LLMConfig(ConfigNode):
     weight: int
     template: str
+    pool_size: int
 
 
 class FaceConfig(ConfigNode):
@@ -134,11 +203,14 @@ class MemeConfig(ConfigNode):
     weight: int
     pool: list[str]
     paths: list[str]
+    cache_mb: int
 
 
 class RecordConfig(ConfigNode):
     weight: int
     pool: list[str]
+    paths: list[str]
+    transcode: bool
 
 
 class BanConfig(ConfigNode):
@@ -154,16 +226,56 @@ class CommandConfig(ConfigNode):
     pool: list[str]
 
 
+class KeywordMatchConfig(ConfigNode):
+    ignore_case: bool
+    normalize_width: bool
+    whole_word: bool
+
+
+class LoadShedConfig(ConfigNode):
+    enabled: bool
+    window: int
+    shed_rate: int
+    drop_rate: int
+    cheap_modules: list[str]
+
+
+class PokePacingConfig(ConfigNode):
+    adaptive: bool
+    min_interval: float
+    max_interval: float
+    latency_target: float
+
+
+class PokeBreakerConfig(ConfigNode):
+    enabled: bool
+    threshold: int
+    backoff: int
+    max_backoff: int
+
+
+class MetricsConfig(ConfigNode):
+    export: bool
+    interval: int
+
+
 class SchedulerConfig(ConfigNode):
     enabled: bool
     cron: str
     target: list[str]
     times: int
+    jobs: list[str]
+    max_concurrency: int
+    jitter: float
+    misfire_grace: int
 
 
 class PluginConfig(ConfigNode):
     on_poke: bool
     poke_cd: int
+    persist_state: bool
+    cooldown_backend: str
+    cooldown_shared_path: str
     follow_prob: float
 
     antipoke: AntiPokeConfig
@@ -173,19 +285,28 @@ class PluginConfig(ConfigNode):
     record: RecordConfig
     ban: BanConfig
     command: CommandConfig
+    group_weights: list[str]
+    load_shed: LoadShedConfig
 
     poke_max_times: int
     poke_interval: float
+    poke_account_interval: float
+    poke_pacing: PokePacingConfig
+    poke_pipeline: bool
+    poke_max_inflight: int
+    poke_breaker: PokeBreakerConfig
     poke_keywords: list[str]
+    keyword_match: KeywordMatchConfig
 
     scheduler: SchedulerConfig
+    metrics: MetricsConfig
 
     _plugin_name = "astrbot_plugin_pokepro"
 
     def __init__(self, cfg: AstrBotConfig, context: Context):
         super().__init__(cfg)
         self.context = context
-        self.target_list = self._parse_target()
+        self.schedule_jobs = self._parse_jobs()
 
         self.root_dir = Path(get_astrbot_root())
         self.data_dir = Path(get_astrbot_plugin_data_path()) / self._plugin_name
@@ -194,20 +315,117 @@ class PluginConfig(ConfigNode):
         self.file_pool_dir = self.data_dir / "files" / "meme" / "pool"
         self.file_pool_dir.mkdir(parents=True, exist_ok=True)
 
+        self.meme_index = MemeIndex(
+            self.data_dir / "meme_index.db", ALLOWED_IMAGE_EXTENSIONS
+        )
+        self.record_index = MemeIndex(
+            self.data_dir / "record_index.db", AUDIO_EXTENSIONS
+        )
+        self._meme_scan_pending = False
+        # 语音目录首次扫描完成后置位（预转码等它再取语音池）
+        self.records_scanned = threading.Event()
         self.meme_image_pool = self._collect_meme_images()
+        self.record_pool = self._collect_records()
         self._ensure_non_empty_pools()
         self.save_config()
 
-    def _parse_target(self) -> list[tuple[str, str]]:
+        # 先用索引里的图片池/语音池（从未索引过的目录先不计入），后台增量扫描完成后再替换
+        threading.Thread(
+            target=self._rescan_pools, name="pokepro-pool-scan", daemon=True
+        ).start()
+
+    def save_config(self) -> None:
+        """保存配置，并重新编译依赖配置的运行时结构"""
+        super().save_config()
+        self._compile()
+
+    def _compile(self) -> None:
+        """
+        编译运行时结构：只读快照 snap、关键词匹配器、响应策略
+
+        热路径一律读 self.snap（每次重新取，保存配置后会整体替换），
+        可写的配置节点只留给 WebUI 和保存
+        """
+        weights = MappingProxyType(
+            {
+                PokeModel.ANTIPOKE: self.antipoke.weight,
+                PokeModel.LLM: self.llm.weight,
+                PokeModel.FACE: self.face.weight,
+                PokeModel.MEME: self.meme.weight,
+                PokeModel.RECORD: self.record.weight,
+                PokeModel.BAN: self.ban.weight,
+                PokeModel.COMMAND: self.command.weight,
+            }
+        )
+        self.snap = self.freeze(weights=weights)
+
+        opts = self.snap.keyword_match
+        self.keyword_matcher = KeywordMatcher(
+            self.snap.poke_keywords or [],
+            ignore_case=opts.ignore_case,
+            normalize_width=opts.normalize_width,
+            whole_word=opts.whole_word,
+        )
+        self.response_policy = self._build_response_policy()
+
+    def _build_response_policy(self) -> ResponsePolicy:
+        weights = self.snap.weights
+        if not any(w > 0 for w in weights.values()):
+            logger.warning("所有响应模块权重均为 0，戳一戳功能已禁用")
+
+        group_weights = {}
+        for line in self.snap.group_weights or []:
+            try:
+                group_weights.update(parse_group_weights([line]))
+            except ValueError as e:
+                logger.warning(f"{e}，已跳过")
+
+        cheap = set()
+        for name in self.snap.load_shed.cheap_modules or []:
+            try:
+                cheap.add(PokeModel(str(name).strip()))
+            except ValueError:
+                logger.warning(f"未知的廉价模块: {name}，已跳过")
+        return ResponsePolicy(weights, group_weights, cheap)
+
+    @staticmethod
+    def _parse_target(items: list[str]) -> list[tuple[str, str]]:
         target_list = []
-        for arg in self.scheduler.target:
+        for arg in items:
             try:
-                group, qq = arg.split(":")
-                target_list.append((group, qq))
+                group, qq = (part.strip() for part in arg.strip().split(":"))
             except ValueError:
-                pass
+                continue
+            if not group.isdigit() or not qq.isdigit():
+                logger.warning(f"定时戳目标无效（群号和QQ号须为数字），已跳过：{arg}")
+                continue
+            target_list.append((group, qq))
         return target_list
 
+    def _parse_jobs(self) -> list[ScheduleJob]:
+        """
+        解析定时戳任务：cron/target/times 为默认任务，
+        jobs 中每行为一个命名任务，格式：名称|cron|群号:QQ号,群号:QQ号|次数
+        """
+        cfg = self.scheduler
+        jobs = []
+        if cfg.cron and cfg.target:
+            targets = self._parse_target(cfg.target)
+            jobs.append(ScheduleJob("default", cfg.cron, targets, cfg.times))
+        for line in cfg.jobs or []:
+            parts = [p.strip() for p in str(line).split("|")]
+            if len(parts) not in (3, 4) or not parts[0]:
+                logger.warning(f"定时戳任务格式错误，已跳过：{line}")
+                continue
+            try:
+                times = int(parts[3]) if len(parts) == 4 else cfg.times
+            except ValueError:
+                logger.warning(f"定时戳任务次数无效，已跳过：{line}")
+                continue
+            targets = self._parse_target(parts[2].split(","))
+            jobs.append(ScheduleJob(parts[0], parts[1], targets, max(1, times)))
+        return jobs
+
     def _ensure_non_empty_pools(self) -> None:
         if not self.face.pool:
             self.face.pool.append(1)
@@ -217,7 +435,8 @@ class PluginConfig(ConfigNode):
             self.command.pool.append("盒")
             logger.warning("命令池为空，已添加默认值：盒")
 
-        if not self.meme_image_pool:
+        # 图库首次扫描还在后台进行时先不补默认图，以免把 logo 写进配置
+        if not self.meme_image_pool and not self._meme_scan_pending:
             target = self.file_pool_dir / self.logo_path.name
             default_path = "files/meme/pool/logo.png"
             if default_path not in self.meme.pool:
@@ -232,7 +451,14 @@ class PluginConfig(ConfigNode):
                     )
             self.meme_image_pool = self._collect_meme_images()
 
-    def _collect_meme_images(self) -> list[str]:
+    def _collect_meme_images(self, scan: bool = False) -> list[str]:
+        """
+        汇总表情包图片池 + 图库路径池
+
+        图库目录的图片来自 meme_index：scan=False 时直接读索引，
+        有目录从未索引过时先不计入图库（留给后台首次扫描，不阻塞加载）；
+        scan=True 时增量扫描目录并更新索引
+        """
         image_pool: list[str] = []
         seen: set[str] = set()
 
@@ -246,6 +472,7 @@ class PluginConfig(ConfigNode):
             seen.add(resolved)
             image_pool.append(resolved)
 
+        gallery_dirs: list[Path] = []
         for raw_path in self.meme.paths or []:
             search_path = self._resolve_meme_search_path(raw_path)
             if search_path is None:
@@ -255,32 +482,119 @@ class PluginConfig(ConfigNode):
                 if search_path.suffix.lower() not in ALLOWED_IMAGE_EXTENSIONS:
                     logger.warning(f"表情包图库文件格式不受支持，已跳过：{search_path}")
                     continue
-                candidates = [search_path]
+                resolved = str(search_path)
+                if resolved not in seen:
+                    seen.add(resolved)
+                    image_pool.append(resolved)
             elif search_path.is_dir():
-                candidates = sorted(
-                    path
-                    for path in search_path.rglob("*")
-                    if path.is_file()
-                    and path.suffix.lower() in ALLOWED_IMAGE_EXTENSIONS
-                )
+                gallery_dirs.append(search_path)
             else:
                 logger.warning(f"表情包图库路径不存在，已跳过：{search_path}")
-                continue
 
-            if not candidates:
-                logger.warning(f"表情包图库路径下未找到图片，已跳过：{search_path}")
+        if scan:
+            galleries = self.meme_index.scan(gallery_dirs)
+            for root, images in galleries.items():
+                if not images:
+                    logger.warning(f"表情包图库路径下未找到图片，已跳过：{root}")
+        else:
+            galleries = self.meme_index.load(gallery_dirs)
+            if galleries is None:
+                self._meme_scan_pending = True
+                galleries = {}
+
+        for images in galleries.values():
+            for image_path in images:
+                if image_path in seen:
+                    continue
+                seen.add(image_path)
+                image_pool.append(image_path)
+
+        return image_pool
+
+    def _rescan_pools(self) -> None:
+        """后台线程：依次增量扫描表情包图库和语音目录"""
+        self._rescan_meme_images()
+        self._rescan_records()
+
+    def _rescan_meme_images(self) -> None:
+        """增量扫描图库，完成后整体替换图片池"""
+        try:
+            pool = self._collect_meme_images(scan=True)
+        except Exception as e:
+            logger.error(f"表情包图库扫描失败，继续使用上次的索引：{e}")
+            return
+        self.meme_image_pool = pool
+        self._meme_scan_pending = False
+        logger.debug(f"表情包图库扫描完成，共 {len(pool)} 张图片")
+
+    def _rescan_records(self) -> None:
+        """增量扫描语音目录，完成后整体替换语音池"""
+        try:
+            pool = self._collect_records(scan=True)
+        except Exception as e:
+            logger.error(f"语音目录扫描失败，继续使用上次的索引：{e}")
+            return
+        finally:
+            self.records_scanned.set()
+        self.record_pool = pool
+        logger.debug(f"语音目录扫描完成，共 {len(pool)} 条语音")
+
+    def _collect_records(self, scan: bool = False) -> list[str]:
+        """
+        汇总语音池 + 语音路径池
+
+        语音目录的文件来自 record_index，与表情包图库相同：
+        scan=False 时直接读索引，从未索引过的目录先不计入；scan=True 时增量扫描
+        """
+        record_pool: list[str] = []
+        seen: set[str] = set()
+
+        candidates: list[Path] = []
+        for raw_path in self.record.pool or []:
+            if raw_path:
+                candidates.append(self.data_dir / raw_path)
+
+        record_dirs: list[Path] = []
+        for raw_path in self.record.paths or []:
+            search_path = self._resolve_meme_search_path(raw_path)
+            if search_path is None:
                 continue
+            if search_path.is_dir():
+                record_dirs.append(search_path)
+            elif search_path.is_file():
+                candidates.append(search_path)
+            else:
+                logger.warning(f"语音路径不存在，已跳过：{search_path}")
 
-            for image_path in candidates:
-                if image_path.suffix.lower() not in ALLOWED_IMAGE_EXTENSIONS:
-                    continue
-                resolved = str(image_path.resolve())
-                if resolved in seen:
+        for path in candidates:
+            if path.suffix.lower() not in AUDIO_EXTENSIONS:
+                logger.warning(f"不支持的语音格式，已跳过：{path}")
+                continue
+            resolved = path.resolve(strict=False)
+            if not resolved.is_file():
+                logger.warning(f"语音文件不存在，已跳过：{resolved}")
+                continue
+            if str(resolved) in seen:
+                continue
+            seen.add(str(resolved))
+            record_pool.append(str(resolved))
+
+        if scan:
+            dirs = self.record_index.scan(record_dirs)
+            for root, records in dirs.items():
+                if not records:
+                    logger.warning(f"语音路径下未找到支持的音频文件，已跳过：{root}")
+        else:
+            dirs = self.record_index.load(record_dirs) or {}
+
+        for records in dirs.values():
+            for record_path in records:
+                if record_path in seen:
                     continue
-                seen.add(resolved)
-                image_pool.append(resolved)
+                seen.add(record_path)
+                record_pool.append(record_path)
 
-        return image_pool
+        return record_pool
 
     def _resolve_meme_pool_file(self, raw_path: str) -> Path | None:
         if not raw_path:
@@ -315,28 +629,29 @@ class PluginConfig(ConfigNode):
 
     def hit_poke_keywords(self, text: str) -> bool:
         """判断是否命中关键词"""
-        return any(k in text for k in self.poke_keywords)
+        return self.keyword_matcher.search(text)
 
     def get_antipoke_times(self) -> int:
         """获取反戳次数"""
-        return random.randint(1, self.antipoke.max_times)
+        return random.randint(1, self.snap.antipoke.max_times)
 
     def get_face_copy_count(self):
         """获取QQ表情复制次数"""
-        return random.randint(1, self.face.max_copy_count)
+        return random.randint(1, self.snap.face.max_copy_count)
 
     def get_ban_time(self) -> int:
         """获取禁言时间"""
-        delta = random.randint(-self.ban.delta, self.ban.delta)
-        return max(0, self.ban.duration + delta)
+        ban = self.snap.ban
+        delta = random.randint(-ban.delta, ban.delta)
+        return max(0, ban.duration + delta)
 
     def get_command(self):
         """获取命令"""
-        return random.choice(self.command.pool)
+        return random.choice(self.snap.command.pool)
 
     def get_face(self) -> int:
         """获取表情包"""
-        return random.choice(self.face.pool)
+        return random.choice(self.snap.face.pool)
 
     def get_image(self) -> str:
         """获取图片"""
@@ -346,19 +661,9 @@ class PluginConfig(ConfigNode):
 
     def get_record(self) -> str:
         """获取语音"""
-        if not self.record.pool:
+        if not self.record_pool:
             return ""
-        rel_path = Path(random.choice(self.record.pool))
-        abs_path = self.data_dir / rel_path
-        return str(abs_path.resolve())
+        return random.choice(self.record_pool)
 
     def weight_of(self, module: PokeModel) -> int:
-        return {
-            PokeModel.ANTIPOKE: self.antipoke.weight,
-            PokeModel.LLM: self.llm.weight,
-            PokeModel.FACE: self.face.weight,
-            PokeModel.MEME: self.meme.weight,
-            PokeModel.RECORD: self.record.weight,
-            PokeModel.BAN: self.ban.weight,
-            PokeModel.COMMAND: self.command.weight,
-        }[module]
+        return self.snap.weights[module]
@@ -2,19 +2,63 @@
 from __future__ import annotations
 
 import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from typing import TYPE_CHECKING
 
-from .config import PluginConfig
+if TYPE_CHECKING:
+    from .config import PluginConfig
 
 
 class Cooldown:
-    """按 (group_id, user_id) 维度的冷却器"""
+    """
+    按 (group_id, user_id) 维度的冷却器
 
-    def __init__(self, config: PluginConfig):
+    - 记录按最后触发时间排序（OrderedDict 队尾最新），放行写入时从队头顺带清理过期记录；
+      冷却中被拒绝的调用只做一次查表
+    - 条目数有硬上限，超出时淘汰最久未触发的记录（LRU）
+    - allow / remaining / reset 均为 O(1)（清理为均摊 O(1)）
+    - on_trigger 在每次放行时回调 (group_id, user_id)，供持久化使用
+    """
+
+    # 单次调用最多顺带清理的过期条目数，避免偶发长停顿
+    _SWEEP_BATCH = 64
+
+    def __init__(
+        self,
+        config: PluginConfig,
+        max_entries: int = 100_000,
+        on_trigger: Callable[[int, int], None] | None = None,
+    ):
         self.cfg = config
+        self.on_trigger = on_trigger
         self.cd: float = config.poke_cd
-        self._last_trigger: dict[tuple[int, int], float] = {}
+        self.max_entries = max(1, max_entries)
+        self._last_trigger: OrderedDict[tuple[int, int], float] = OrderedDict()
         self._clock = time.monotonic
 
+        # 统计
+        self.expired = 0
+        self.evictions = 0
+
+    @property
+    def live(self) -> int:
+        """当前存活的冷却条目数"""
+        return len(self._last_trigger)
+
+    def _sweep(self, now: float) -> None:
+        """从队头清理已过冷却期的条目"""
+        store = self._last_trigger
+        deadline = now - self.cd
+        for _ in range(self._SWEEP_BATCH):
+            if not store:
+                return
+            key, last = next(iter(store.items()))
+            if last > deadline:
+                return
+            del store[key]
+            self.expired += 1
+
     def allow(self, group_id: int | None, user_id: int) -> bool:
         """
         判断是否允许触发
@@ -26,14 +70,43 @@ class Cooldown:
         key = (gid, uid)
 
         now = self._clock()
-        last = self._last_trigger.get(key)
+        store = self._last_trigger
+        last = store.get(key)
 
         if last is not None and now - last < self.cd:
             return False
 
-        self._last_trigger[key] = now
+        # 只在写入时清理：写入才会让条目变多
+        self._sweep(now)
+        store[key] = now
+        store.move_to_end(key)
+        if len(store) > self.max_entries:
+            store.popitem(last=False)
+            self.evictions += 1
+        if self.on_trigger is not None:
+            self.on_trigger(gid, uid)
         return True
 
+    def restore(self, entries: Iterable[tuple[int, int, float]]) -> int:
+        """
+        恢复持久化的冷却记录：(group_id, user_id, 距今秒数)，须按时间先后排列；
+        已过冷却期的记录会被忽略，返回恢复的条数
+        """
+        store = self._last_trigger
+        now = self._clock()
+        restored = 0
+        for gid, uid, age in entries:
+            if age >= self.cd:
+                continue
+            key = (int(gid), int(uid))
+            store[key] = now - age
+            store.move_to_end(key)
+            restored += 1
+        while len(store) > self.max_entries:
+            store.popitem(last=False)
+            self.evictions += 1
+        return restored
+
     def remaining(self, group_id: int | None, user_id: int) -> float:
         """返回剩余冷却时间（秒），<=0 表示已冷却"""
         gid = int(group_id or 0)
@@ -56,3 +129,11 @@ class Cooldown:
     def clear(self) -> None:
         """清空所有冷却（热重载配置时可用）"""
         self._last_trigger.clear()
+
+    def stats(self) -> dict[str, int]:
+        """冷却存储统计"""
+        return {
+            "live": self.live,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
@@ -4,33 +4,59 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
 )
 from astrbot.core.star.context import Context
 
+from .cache import TTLCache
 from .config import PluginConfig
-from .utils import get_nickname
+from .nickname import NicknameCache
+
+# 会切换/重置当前对话的 AstrBot 内置命令
+CONVERSATION_COMMANDS = {"new", "switch", "del", "reset"}
 
 
 class LLMService:
-    def __init__(self, context: Context, config: PluginConfig):
+    def __init__(
+        self, context: Context, config: PluginConfig, nicknames: NicknameCache
+    ):
         self.context = context
         self.cfg = config
+        self.nicknames = nicknames
+        # unified_msg_origin → 当前对话 ID
+        self._cid_cache: TTLCache[str, str] = TTLCache(maxsize=1024, ttl=60.0)
 
     async def get_conversation(self, event: AiocqhttpMessageEvent):
         """获取或创建当前会话的 conversation 对象"""
         umo = event.unified_msg_origin
         conv_mgr = self.context.conversation_manager
         try:
+            cid = self._cid_cache.get(umo)
+            if cid:
+                conversation = await conv_mgr.get_conversation(umo, cid)
+                if conversation is not None:
+                    return conversation
+                self._cid_cache.pop(umo)
+
             cid = await conv_mgr.get_curr_conversation_id(umo)
             if not cid:
                 cid = await conv_mgr.new_conversation(umo, event.get_platform_id())
+            self._cid_cache.set(umo, cid)
             return await conv_mgr.get_conversation(umo, cid)
         except Exception as e:
             logger.warning(f"[Pokepro] 获取 conversation 失败: {e}")
             return None
 
-    async def build_prompt(
-        self, event: AiocqhttpMessageEvent, prompt_template: str
-    ) -> str:
-        """构建用户 prompt"""
-        username = await get_nickname(
+    def invalidate_conversation(self, umo: str) -> None:
+        """失效某会话缓存的对话 ID"""
+        self._cid_cache.pop(umo)
+
+    def watch_command(self, event: AiocqhttpMessageEvent) -> None:
+        """用户切换/重置对话时失效缓存"""
+        if not event.is_at_or_wake_command:
+            return
+        parts = event.message_str.split(maxsplit=1)
+        if parts and parts[0].lstrip("/") in CONVERSATION_COMMANDS:
+            self.invalidate_conversation(event.unified_msg_origin)
+
+    async def get_username(self, event: AiocqhttpMessageEvent) -> str:
+        """获取发送者昵称"""
+        return await self.nicknames.get(
             event.bot, event.get_group_id(), event.get_sender_id()
         )
-        return prompt_template.format(username=username)
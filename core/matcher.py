@@ -0,0 +1,140 @@
+# core/matcher.py
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable
+
+# 全角 ASCII（！～）与全角空格 → 半角
+_WIDTH_TABLE = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+_WIDTH_TABLE[0x3000] = 0x20
+
+
+def _is_word_char(ch: str) -> bool:
+    """英文单词字符（用于整词匹配的边界判断）"""
+    return ch.isascii() and (ch.isalnum() or ch == "_")
+
+
+class KeywordMatcher:
+    """
+    多关键词匹配器（Aho-Corasick 自动机）
+
+    - 关键词在构造时编译一次，匹配只扫描文本一遍
+    - 关键词较少时（且不要求整词）直接用 `in` 逐个判断，C 实现的子串查找更快
+    - ignore_case: 忽略大小写
+    - normalize_width: 全角字符按半角处理
+    - whole_word: 英文关键词须整词命中（中文关键词不受影响）
+    """
+
+    __slots__ = (
+        "ignore_case",
+        "normalize_width",
+        "whole_word",
+        "_goto",
+        "_fail",
+        "_out",
+        "_plain",
+    )
+
+    # 少于该数量的关键词走逐个 `in` 判断
+    _LINEAR_MAX = 128
+
+    def __init__(
+        self,
+        keywords: Iterable[str],
+        *,
+        ignore_case: bool = False,
+        normalize_width: bool = False,
+        whole_word: bool = False,
+    ):
+        self.ignore_case = ignore_case
+        self.normalize_width = normalize_width
+        self.whole_word = whole_word
+
+        # 节点 0 为根；_out[n] 为在节点 n 结束的所有关键词长度
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[int, ...]] = [()]
+
+        normalized = [k for k in (self.normalize(str(k)) for k in keywords) if k]
+        self._plain: tuple[str, ...] | None = None
+        if len(normalized) < self._LINEAR_MAX and not whole_word:
+            self._plain = tuple(normalized)
+        else:
+            for keyword in normalized:
+                self._insert(keyword)
+            self._link()
+
+    def __bool__(self) -> bool:
+        if self._plain is not None:
+            return bool(self._plain)
+        return bool(self._goto[0])
+
+    def normalize(self, text: str) -> str:
+        if self.normalize_width:
+            text = text.translate(_WIDTH_TABLE)
+        if self.ignore_case:
+            text = text.casefold()
+        return text
+
+    def _insert(self, keyword: str) -> None:
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._goto[node][ch] = nxt
+            node = nxt
+        if len(keyword) not in self._out[node]:
+            self._out[node] += (len(keyword),)
+
+    def _link(self) -> None:
+        """BFS 构建失配指针，并把失配链上的输出合并到当前节点"""
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0) if node else 0
+                out[nxt] += out[fail[nxt]]
+
+    def _is_whole(self, text: str, end: int, length: int) -> bool:
+        start = end - length + 1
+        if start > 0 and _is_word_char(text[start]) and _is_word_char(text[start - 1]):
+            return False
+        nxt = end + 1
+        if nxt < len(text) and _is_word_char(text[end]) and _is_word_char(text[nxt]):
+            return False
+        return True
+
+    def search(self, text: str) -> bool:
+        """文本中是否包含任一关键词"""
+        if not text:
+            return False
+        text = self.normalize(text)
+        if self._plain is not None:
+            return any(k in text for k in self._plain)
+
+        goto, fail, out = self._goto, self._fail, self._out
+        whole_word = self.whole_word
+
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            lengths = out[node]
+            if not lengths:
+                continue
+            if not whole_word:
+                return True
+            for length in lengths:
+                if self._is_whole(text, i, length):
+                    return True
+        return False
@@ -0,0 +1,90 @@
+# core/media_cache.py
+from __future__ import annotations
+
+import asyncio
+import base64
+import os
+from collections import OrderedDict
+
+
+class ImageCache:
+    """
+    表情包图片缓存：图片路径 → 可直接发送的 base64 字符串
+
+    - 以 (mtime, size) 校验，文件被修改后自动重新读取
+    - 按字节预算 LRU 淘汰
+    - 编码后超过 max_item_bytes 的图片不读不缓存，返回 None 由调用方直接发文件路径
+    - 读文件在线程中进行，不阻塞事件循环
+    """
+
+    def __init__(
+        self,
+        budget_bytes: int,
+        max_item_bytes: int | None = None,
+    ):
+        self.budget_bytes = budget_bytes
+        self.max_item_bytes = max_item_bytes or budget_bytes // 4
+        self._data: OrderedDict[str, tuple[int, int, str]] = OrderedDict()
+        self._bytes = 0
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bypassed = 0
+
+    async def get(self, path: str) -> str | None:
+        """返回图片的 base64 字符串，读取失败返回 None"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if (st.st_size + 2) // 3 * 4 > self.max_item_bytes:
+            self.bypassed += 1
+            return None
+
+        item = self._data.get(path)
+        if item is not None and item[0] == st.st_mtime_ns and item[1] == st.st_size:
+            self._data.move_to_end(path)
+            self.hits += 1
+            return item[2]
+
+        self.misses += 1
+        try:
+            b64 = await asyncio.to_thread(self._read, path)
+        except OSError:
+            return None
+        self._store(path, st.st_mtime_ns, st.st_size, b64)
+        return b64
+
+    def _read(self, path: str) -> str:
+        with open(path, "rb") as f:
+            return base64.b64encode(f.read()).decode()
+
+    def _store(self, path: str, mtime_ns: int, size: int, b64: str) -> None:
+        old = self._data.pop(path, None)
+        if old is not None:
+            self._bytes -= len(old[2])
+        if len(b64) > self.max_item_bytes:
+            return
+
+        self._data[path] = (mtime_ns, size, b64)
+        self._bytes += len(b64)
+        while self._bytes > self.budget_bytes and self._data:
+            _, (_, _, evicted) = self._data.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bypassed": self.bypassed,
+        }
@@ -0,0 +1,167 @@
+# core/meme_index.py
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from collections.abc import Collection, Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path     TEXT PRIMARY KEY,
+    root     TEXT NOT NULL,
+    parent   TEXT,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dirs_root ON dirs (root);
+CREATE TABLE IF NOT EXISTS files (
+    path     TEXT PRIMARY KEY,
+    root     TEXT NOT NULL,
+    dir      TEXT NOT NULL,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_root ON files (root);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+"""
+
+
+class MemeIndex:
+    """
+    表情包图库索引（SQLite），语音目录也用它建索引（各用一个数据库）
+
+    - 记录每个图库目录下所有 extensions 格式文件的路径、大小、修改时间
+    - load: 直接从索引读出图片列表，不访问图库目录
+    - scan: 增量扫描，目录 mtime 未变化时复用索引中该目录的记录，
+      只对有变化的目录调用 scandir
+    - 可在后台线程调用 scan，每次调用使用独立的数据库连接
+    """
+
+    def __init__(self, db_path: Path, extensions: Collection[str]):
+        self.db_path = db_path
+        self.extensions = {ext.lower() for ext in extensions}
+        self._scan_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load(self, roots: Iterable[Path]) -> dict[str, list[str]] | None:
+        """从索引读取各图库目录的图片；存在未索引过的目录时返回 None"""
+        result: dict[str, list[str]] = {}
+        with self._connect() as conn:
+            for root in map(str, roots):
+                if not conn.execute(
+                    "SELECT 1 FROM dirs WHERE path = ?", (root,)
+                ).fetchone():
+                    return None
+                result[root] = [
+                    row[0]
+                    for row in conn.execute(
+                        "SELECT path FROM files WHERE root = ? ORDER BY path", (root,)
+                    )
+                ]
+        return result
+
+    def scan(self, roots: Iterable[Path]) -> dict[str, list[str]]:
+        """增量扫描各图库目录并写回索引"""
+        roots = [str(root) for root in roots]
+        with self._scan_lock, self._connect() as conn:
+            result = {root: self._scan_root(conn, root) for root in roots}
+            placeholders = ",".join("?" * len(roots))
+            # 清理已从配置中移除的图库
+            for table in ("dirs", "files"):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE root NOT IN ({placeholders})", roots
+                )
+        return result
+
+    def _scan_root(self, conn: sqlite3.Connection, root: str) -> list[str]:
+        known_dirs: dict[str, int] = {}
+        children: dict[str, list[str]] = {}
+        for path, parent, mtime_ns in conn.execute(
+            "SELECT path, parent, mtime_ns FROM dirs WHERE root = ?", (root,)
+        ):
+            known_dirs[path] = mtime_ns
+            if parent is not None:
+                children.setdefault(parent, []).append(path)
+
+        known_files: dict[str, list[str]] = {}
+        for path, dir_ in conn.execute(
+            "SELECT path, dir FROM files WHERE root = ?", (root,)
+        ):
+            known_files.setdefault(dir_, []).append(path)
+
+        images: list[str] = []
+        seen_dirs: set[str] = set()
+        stack: list[tuple[str, str | None]] = [(root, None)]
+        while stack:
+            path, parent = stack.pop()
+            if path in seen_dirs:
+                continue
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            seen_dirs.add(path)
+
+            if known_dirs.get(path) == mtime_ns:
+                # 目录未变化：复用索引
+                images.extend(known_files.get(path, ()))
+                stack.extend((sub, path) for sub in children.get(path, ()))
+                continue
+
+            files, subdirs = self._scandir(path)
+            conn.execute("DELETE FROM files WHERE dir = ?", (path,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO files (path, root, dir, size, mtime_ns) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(f, root, path, size, mtime) for f, size, mtime in files],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO dirs (path, root, parent, mtime_ns) "
+                "VALUES (?, ?, ?, ?)",
+                (path, root, parent, mtime_ns),
+            )
+            images.extend(f for f, _, _ in files)
+            stack.extend((sub, path) for sub in subdirs)
+
+        # 清理已删除的子目录
+        for path in known_dirs.keys() - seen_dirs:
+            conn.execute("DELETE FROM dirs WHERE path = ?", (path,))
+            conn.execute("DELETE FROM files WHERE dir = ?", (path,))
+
+        images.sort()
+        return images
+
+    def _scandir(self, path: str) -> tuple[list[tuple[str, int, int]], list[str]]:
+        files: list[tuple[str, int, int]] = []
+        subdirs: list[str] = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif (
+                            entry.is_file()
+                            and os.path.splitext(entry.name)[1].lower()
+                            in self.extensions
+                        ):
+                            st = entry.stat()
+                            files.append((entry.path, st.st_size, st.st_mtime_ns))
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return files, subdirs
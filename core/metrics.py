@@ -0,0 +1,247 @@
+# core/metrics.py
+from __future__ import annotations
+
+import asyncio
+import os
+from bisect import bisect_left
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+
+from astrbot.api import logger
+
+# 默认耗时分桶（秒），覆盖本地处理到慢速 LLM 请求
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Counter:
+    """带标签的计数器，每组标签值一个整数"""
+
+    __slots__ = ("name", "help", "labelnames", "_values")
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple[str, ...], int] = {}
+
+    def inc(self, *labels: str, amount: int = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels: str) -> int:
+        return self._values.get(labels, 0)
+
+    def items(self) -> list[tuple[tuple[str, ...], int]]:
+        return list(self._values.items())
+
+    def total(self) -> int:
+        return sum(self._values.values())
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        if not self.labelnames and not self._values:
+            lines.append(f"{self.name} 0")
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    带标签的固定分桶直方图
+
+    每组标签值一个定长计数列表（各桶非累计计数 + 溢出桶），
+    observe 只做一次二分查找和两次加法
+    """
+
+    __slots__ = ("name", "help", "labelnames", "buckets", "_series")
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 → [各桶计数..., 溢出桶计数, 总和]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def quantile(self, q: float, *labels: str) -> float:
+        """按桶上界估算分位数，落在溢出桶时返回 inf"""
+        series = self._series.get(labels)
+        if not series:
+            return 0.0
+        counts = series[:-1]
+        rank = q * sum(counts)
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= rank and c:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return 0.0
+
+    def summary(self) -> dict[tuple[str, ...], tuple[int, float, float, float]]:
+        """各标签组的 (次数, 平均值, p50, p99)"""
+        result = {}
+        for labels, series in self._series.items():
+            n = int(sum(series[:-1]))
+            result[labels] = (
+                n,
+                series[-1] / n if n else 0.0,
+                self.quantile(0.5, *labels),
+                self.quantile(0.99, *labels),
+            )
+        return result
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, c in zip((*self.buckets, float("inf")), series[:-1]):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                names = (*self.labelnames, "le")
+                lines.append(
+                    f"{self.name}_bucket{_labels(names, (*labels, le))} {cumulative}"
+                )
+            tag = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{tag} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{tag} {cumulative}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class MetricsRegistry:
+    """指标注册表：按注册顺序渲染为 Prometheus 文本格式"""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+
+    def counter(
+        self, name: str, help: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        metric = self._metrics.setdefault(name, Counter(name, help, labelnames))
+        assert isinstance(metric, Counter)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = self._metrics.setdefault(
+            name, Histogram(name, help, labelnames, buckets)
+        )
+        assert isinstance(metric, Histogram)
+        return metric
+
+    def __iter__(self) -> Iterator[Counter | Histogram]:
+        return iter(list(self._metrics.values()))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# 全局注册表，插件内各处直接引用下面的指标对象
+REGISTRY = MetricsRegistry()
+
+POKES_RECEIVED = REGISTRY.counter(
+    "pokepro_pokes_received_total", "收到的戳一戳事件数（不含自己发出的）"
+)
+COOLDOWN_REJECTED = REGISTRY.counter(
+    "pokepro_cooldown_rejected_total", "因冷却被忽略的戳一戳数"
+)
+MODULE_SELECTED = REGISTRY.counter(
+    "pokepro_module_selected_total", "响应模块被选中的次数", ("module",)
+)
+HANDLER_SECONDS = REGISTRY.histogram(
+    "pokepro_handler_seconds", "响应模块处理耗时（含预取与发送）", ("module",)
+)
+API_SECONDS = REGISTRY.histogram(
+    "pokepro_api_seconds", "OneBot 接口调用耗时", ("action",)
+)
+API_FAILURES = REGISTRY.counter(
+    "pokepro_api_failures_total", "OneBot 接口调用失败数", ("action",)
+)
+POKE_BREAKER_TRIPS = REGISTRY.counter(
+    "pokepro_poke_breaker_trips_total", "发戳熔断器打开的次数"
+)
+LLM_REQUESTS = REGISTRY.counter(
+    "pokepro_llm_requests_total",
+    "LLM 请求数（realtime 实时请求，pool 命中预生成池，refill 后台预生成）",
+    ("source", "outcome"),
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "pokepro_llm_seconds", "插件直接发起的 LLM 请求耗时", ("source",)
+)
+
+
+class PrometheusFileExporter:
+    """定期把指标以 Prometheus 文本格式写入文件（供 node_exporter textfile 采集）"""
+
+    def __init__(
+        self, registry: MetricsRegistry, path: Path, interval: float = 30.0
+    ):
+        self.registry = registry
+        self.path = path
+        self.interval = max(1.0, interval)
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.write()
+
+    async def write(self) -> None:
+        text = self.registry.render()
+        try:
+            await asyncio.to_thread(self._write, text)
+        except OSError as e:
+            logger.warning(f"[戳一戳] 写入指标文件失败: {e}")
+
+    def _write(self, text: str) -> None:
+        # 先写临时文件再替换，采集方不会读到半个文件
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            await self.write()
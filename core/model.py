@@ -17,48 +17,83 @@ class PokeModel(Enum):
 
 
 @dataclass
+class ScheduleJob:
+    """定时戳任务"""
+
+    name: str
+    cron: str
+    targets: list[tuple[str, str]]  # (群号, QQ号)
+    times: int
+
+
 class PokeEvent:
-    """戳一戳事件"""
+    """
+    戳一戳事件：原始上报字典上的只读视图
 
-    time: int
-    self_id: int
-    user_id: int
-    target_id: int
-    group_id: int | None
+    不复制任何字段，属性访问时才从原始字典读取
+    """
 
-    # OneBot / notice 语义字段
-    post_type: str
-    notice_type: str
-    sub_type: str
+    __slots__ = ("_raw",)
 
-    # 原始附加信息
-    raw_info: list[dict[str, Any]]
+    def __init__(self, raw: dict[str, Any]):
+        self._raw = raw
+
+    @staticmethod
+    def is_poke(raw: dict[str, Any]) -> bool:
+        """原地判断原始上报是否为戳一戳通知（不分配任何对象）"""
+        return (
+            raw.get("sub_type") == "poke"
+            and raw.get("notice_type") == "notify"
+            and raw.get("post_type") == "notice"
+        )
 
     @classmethod
     def from_event(cls, event) -> Optional["PokeEvent"]:
         msg = getattr(event, "message_obj", None)
         raw = getattr(msg, "raw_message", None) if msg else None
-        if not isinstance(raw, dict):
+        if not isinstance(raw, dict) or not cls.is_poke(raw):
             return None
+        return cls(raw)
 
-        if raw.get("post_type") != "notice":
-            return None
-        if raw.get("notice_type") != "notify":
-            return None
-        if raw.get("sub_type") != "poke":
-            return None
+    # ========= 字段 =========
 
-        return cls(
-            time=raw.get("time", 0),
-            self_id=raw.get("self_id", 0),
-            user_id=raw.get("user_id", 0),
-            target_id=raw.get("target_id", 0),
-            group_id=raw.get("group_id"),
-            post_type=raw.get("post_type", ""),
-            notice_type=raw.get("notice_type", ""),
-            sub_type=raw.get("sub_type", ""),
-            raw_info=raw.get("raw_info", []),
-        )
+    @property
+    def time(self) -> int:
+        return self._raw.get("time", 0)
+
+    @property
+    def self_id(self) -> int:
+        return self._raw.get("self_id", 0)
+
+    @property
+    def user_id(self) -> int:
+        return self._raw.get("user_id", 0)
+
+    @property
+    def target_id(self) -> int:
+        return self._raw.get("target_id", 0)
+
+    @property
+    def group_id(self) -> int | None:
+        return self._raw.get("group_id")
+
+    # OneBot / notice 语义字段
+    @property
+    def post_type(self) -> str:
+        return self._raw.get("post_type", "")
+
+    @property
+    def notice_type(self) -> str:
+        return self._raw.get("notice_type", "")
+
+    @property
+    def sub_type(self) -> str:
+        return self._raw.get("sub_type", "")
+
+    # 原始附加信息
+    @property
+    def raw_info(self) -> list[dict[str, Any]]:
+        return self._raw.get("raw_info", [])
 
     # ========= 语义属性 =========
 
@@ -0,0 +1,58 @@
+# core/nickname.py
+from __future__ import annotations
+
+from aiocqhttp import CQHttp
+
+from .cache import SingleFlight, TTLCache
+from .utils import get_nickname
+
+
+class NicknameCache:
+    """
+    群昵称缓存，按 (group_id, user_id) 缓存 get_nickname 的结果
+
+    - TTL + LRU 上限
+    - 查询失败（只拿到数字 UID）时按较短的 negative_ttl 缓存
+    - 同一用户的并发查询合并为一次 API 调用
+    - 收到群名片变更通知时失效
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 4096,
+        ttl: float = 600.0,
+        negative_ttl: float = 60.0,
+    ):
+        self.negative_ttl = negative_ttl
+        self._cache: TTLCache[tuple[int, int], str] = TTLCache(maxsize, ttl)
+        self._flight: SingleFlight[tuple[int, int], str] = SingleFlight()
+
+    @staticmethod
+    def _key(group_id: int | str | None, user_id: int | str) -> tuple[int, int]:
+        gid = int(group_id) if str(group_id).isdigit() else 0
+        return gid, int(user_id)
+
+    async def get(
+        self, client: CQHttp, group_id: int | str | None, user_id: int | str
+    ) -> str:
+        """获取昵称，优先走缓存"""
+        key = self._key(group_id, user_id)
+        name = self._cache.get(key)
+        if name is not None:
+            return name
+        return await self._flight.do(key, lambda: self._load(client, key))
+
+    async def _load(self, client: CQHttp, key: tuple[int, int]) -> str:
+        gid, uid = key
+        name = await get_nickname(client, gid or "", uid)
+        # get_nickname 兜底返回数字 UID，视为查询失败
+        ttl = self.negative_ttl if name == str(uid) else None
+        self._cache.set(key, name, ttl)
+        return name
+
+    def invalidate(self, group_id: int | str | None, user_id: int | str) -> None:
+        """失效某人在某群的昵称"""
+        self._cache.pop(self._key(group_id, user_id))
+
+    def stats(self) -> dict[str, int]:
+        return {**self._cache.stats(), "inflight": len(self._flight)}
@@ -1,9 +1,14 @@
+import asyncio
 import copy
 import random
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
 
 from astrbot.api import logger
 from astrbot.api.message_components import Face
-from astrbot.core.message.components import At, Plain, Record
+from astrbot.core.message.components import At, Image, Plain, Record
 from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
@@ -12,17 +17,71 @@ from astrbot.core.star.context import Context
 from .config import PluginConfig
 from .cooldown import Cooldown
 from .llm import LLMService
+from .media_cache import ImageCache
+from .metrics import (
+    COOLDOWN_REJECTED,
+    HANDLER_SECONDS,
+    LLM_REQUESTS,
+    MODULE_SELECTED,
+    POKES_RECEIVED,
+)
 from .model import PokeEvent, PokeModel
+from .nickname import NicknameCache
+from .pressure import GroupPressure, Pressure
+from .reply_pool import NAME_TOKEN, LLMReplyPool
 from .send_poke import PokeSender
+from .shared_cooldown import SharedCooldown
+from .state_store import StateStore
+from .voice_cache import VoiceCache
+
+
+@dataclass(slots=True)
+class PokeContext:
+    """响应前并发预取的数据（预取失败时保留默认值）"""
+
+    username: str = ""
+    conversation: Any = None
+    banned: bool = False
 
 
 class GetPokeHandler:
-    def __init__(self, context: Context, config: PluginConfig, poke_sender: PokeSender):
+    # 各响应模块需要预取的数据（PokeContext 字段名）
+    _NEEDS: dict[PokeModel, tuple[str, ...]] = {
+        PokeModel.LLM: ("username", "conversation"),
+        PokeModel.BAN: ("banned", "username", "conversation"),
+    }
+    # 各预取阶段的超时（秒）；禁言本身就是动作，超时取消可能已生效的禁言，不设超时
+    _STAGE_TIMEOUT = {"username": 3.0, "conversation": 5.0}
+
+    def __init__(
+        self,
+        context: Context,
+        config: PluginConfig,
+        poke_sender: PokeSender,
+        nicknames: NicknameCache,
+    ):
         self.context = context
         self.cfg = config
         self.sender = poke_sender
-        self.llm = LLMService(context, self.cfg)
-        self.cooldown = Cooldown(self.cfg)
+        self.llm = LLMService(context, self.cfg, nicknames)
+        self.state = (
+            StateStore(self.cfg.data_dir / "state.db")
+            if self.cfg.persist_state
+            else None
+        )
+        self.cooldown = self._make_cooldown()
+        self.pressure = (
+            GroupPressure(self.cfg.load_shed) if self.cfg.load_shed.enabled else None
+        )
+        self.image_cache = (
+            ImageCache(self.cfg.meme.cache_mb << 20) if self.cfg.meme.cache_mb else None
+        )
+        self.voice_cache = VoiceCache(self.cfg.data_dir / "cache" / "record")
+        self.reply_pool = (
+            LLMReplyPool(context, self.llm, self.cfg.llm.pool_size)
+            if self.cfg.llm.pool_size > 0
+            else None
+        )
 
         # 响应池：模块 → handler
         self.handlers = {
@@ -35,67 +94,159 @@ class GetPokeHandler:
             PokeModel.COMMAND: self.respond_cmd,
         }
 
-        # 构建“可选模块池”
-        self._modules, self._weights = self._build_response_pool()
+    def _make_cooldown(self) -> Cooldown | SharedCooldown:
+        """按配置选择冷却后端；共享后端不可用时退回进程内冷却"""
+        on_trigger = self.state.mark_cooldown if self.state else None
+        if self.cfg.cooldown_backend == "mmap":
+            path = self.cfg.cooldown_shared_path
+            try:
+                return SharedCooldown(
+                    self.cfg,
+                    Path(path) if path else self.cfg.data_dir / "cooldown.mmap",
+                    on_trigger=on_trigger,
+                )
+            except OSError as e:
+                logger.warning(f"[戳一戳] 共享冷却不可用，改用进程内冷却: {e}")
+        return Cooldown(self.cfg, on_trigger=on_trigger)
 
-    def _build_response_pool(self):
-        pool = []
-        for module, handler in self.handlers.items():
-            weight = self.cfg.weight_of(module)
-            if weight > 0:
-                pool.append((module, weight))
-
-        if not pool:
-            logger.warning("所有响应模块权重均为 0，戳一戳功能已禁用")
-            return (), ()
+    async def initialize(self):
+        if self.state:
+            try:
+                rows = await self.state.open(self.cooldown.cd)
+                restored = self.cooldown.restore(rows)
+                logger.debug(f"[戳一戳] 已恢复 {restored} 条冷却记录")
+            except Exception as e:
+                logger.error(f"[戳一戳] 加载持久化状态失败: {e}")
+        if self.cfg.record.weight > 0 and self.cfg.record.transcode:
+            self.voice_cache.start(
+                lambda: self.cfg.record_pool, self.cfg.records_scanned
+            )
 
-        modules, weights = zip(*pool)
-        return modules, weights
+    async def terminate(self):
+        if self.state:
+            await self.state.close()
+        if isinstance(self.cooldown, SharedCooldown):
+            self.cooldown.close()
+        await self.voice_cache.close()
+        if self.reply_pool:
+            await self.reply_pool.close()
 
     async def handle(self, event: AiocqhttpMessageEvent):
         """响应戳一戳事件"""
-        if not self._modules:
-            return
-
-        if event.get_extra("is_poked"):
-            return
         evt = PokeEvent.from_event(event)
         if not evt:
             return
+        # 由“触发命令”模块重新投递的事件仍带着原戳一戳上报，跳过
+        if event.get_extra("is_poked"):
+            return
 
         # 忽略自己发送的戳一戳
         if evt.is_self_send:
             return
+        POKES_RECEIVED.inc()
+        if self.state and evt.is_self_poked:
+            self.state.count_poke(evt.group_id or 0, evt.user_id)
+
+        # 群内戳频过高时降载：先只用廉价模块，再完全不响应
+        level = Pressure.NORMAL
+        if self.pressure and evt.group_id:
+            level = self.pressure.hit(evt.group_id)
+            if level is Pressure.DROP:
+                return
 
         # 冷却机制
         if not self.cooldown.allow(evt.group_id, evt.user_id):
+            COOLDOWN_REJECTED.inc()
             return
 
-        # 别人被戳则随机跟戳
-        if not evt.is_self_poked and random.random() < self.cfg.follow_prob:
-            await self.sender.event_send(event, target_ids=[evt.target_id], times=1)
+        # 别人被戳则随机跟戳（降载时不跟戳，免得火上浇油）
+        if (
+            not evt.is_self_poked
+            and level is Pressure.NORMAL
+            and random.random() < self.cfg.snap.follow_prob
+        ):
+            self.sender.event_send(event, target_ids=[evt.target_id], times=1)
             return
 
         # 只响应戳自己的戳
         if not evt.is_self_poked:
             return
 
-        module = random.choices(self._modules, self._weights, k=1)[0]
+        # 按群抽取响应模块（配置变更时整张策略表被替换）
+        module = self.cfg.response_policy.pick(
+            evt.group_id, cheap=level is Pressure.SHED
+        )
+        if module is None:
+            return
         logger.debug(f"[戳一戳] 触发响应模块: {module}")
+        MODULE_SELECTED.inc(module.value)
         handler = self.handlers[module]
 
+        start = time.perf_counter()
         try:
-            async for msg in handler(event):
+            ctx = await self._prefetch(event, module)
+            async for msg in handler(event, ctx):
                 if msg is not None:
                     yield msg
         except Exception as e:
             logger.error(f"执行戳一戳响应失败: {e}", exc_info=True)
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, module.value)
+
+    # ========== 预取 ==========
+
+    async def _prefetch(
+        self, event: AiocqhttpMessageEvent, module: PokeModel
+    ) -> PokeContext:
+        """并发执行模块所需的预取阶段，总耗时取决于最慢的阶段"""
+        ctx = PokeContext(username=event.get_sender_id())
+        needs = self._NEEDS.get(module, ())
+        if (
+            module is PokeModel.LLM
+            and self.reply_pool
+            and self.reply_pool.has(event.unified_msg_origin)
+        ):
+            # 命中预生成回复时只需要昵称
+            needs = ("username",)
+        if not needs:
+            return ctx
+
+        stages = {
+            "username": self.llm.get_username,
+            "conversation": self.llm.get_conversation,
+            "banned": self._try_ban,
+        }
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(stages[name](event), self._STAGE_TIMEOUT.get(name))
+                for name in needs
+            ),
+            return_exceptions=True,
+        )
+        for name, result in zip(needs, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"[戳一戳] 预取 {name} 失败，使用默认值: {result!r}")
+                continue
+            setattr(ctx, name, result)
+        return ctx
+
+    async def _try_ban(self, event: AiocqhttpMessageEvent) -> bool:
+        """禁言发送者，返回是否成功"""
+        try:
+            await event.bot.set_group_ban(
+                group_id=int(event.get_group_id()),
+                user_id=int(event.get_sender_id()),
+                duration=self.cfg.get_ban_time(),
+            )
+            return True
+        except Exception:
+            return False
 
     # ========== 响应函数 ==========
 
-    async def respond_poke(self, event: AiocqhttpMessageEvent):
+    async def respond_poke(self, event: AiocqhttpMessageEvent, ctx: PokeContext):
         """反戳"""
-        await self.sender.event_send(
+        self.sender.event_send(
             event,
             target_ids=[event.get_sender_id()],
             times=self.cfg.get_antipoke_times(),
@@ -103,57 +254,61 @@ class GetPokeHandler:
         event.stop_event()
         yield None
 
-    async def respond_llm(self, event: AiocqhttpMessageEvent):
+    async def respond_llm(self, event: AiocqhttpMessageEvent, ctx: PokeContext):
         """调用llm回复"""
-        template = self.cfg.llm.template
-        prompt = await self.llm.build_prompt(event, template)
-        conversation = await self.llm.get_conversation(event)
-        yield event.request_llm(prompt=prompt, conversation=conversation)
+        template = self.cfg.snap.llm.template
+        if self.reply_pool:
+            reply = self.reply_pool.take(event.unified_msg_origin)
+            self.reply_pool.refill(event, template)
+            if reply is not None:
+                LLM_REQUESTS.inc("pool", "hit")
+                yield event.plain_result(reply.replace(NAME_TOKEN, ctx.username))
+                return
+            if ctx.conversation is None:
+                # 预取时池中尚有回复、这期间被取空，补取对话
+                ctx.conversation = await self.llm.get_conversation(event)
+        prompt = template.format(username=ctx.username)
+        LLM_REQUESTS.inc("realtime", "requested")
+        yield event.request_llm(prompt=prompt, conversation=ctx.conversation)
 
-    async def respond_face(self, event: AiocqhttpMessageEvent):
+    async def respond_face(self, event: AiocqhttpMessageEvent, ctx: PokeContext):
         """回复emoji(QQ表情)"""
         face_id = self.cfg.get_face()
         copy_count = self.cfg.get_face_copy_count()
         faces_chain: list[Face] = [Face(id=face_id)] * copy_count
         yield event.chain_result(faces_chain)  # type: ignore
 
-    async def respond_meme(self, event: AiocqhttpMessageEvent):
+    async def respond_meme(self, event: AiocqhttpMessageEvent, ctx: PokeContext):
         """回复表情包"""
         img = self.cfg.get_image()
         if img:
-            yield event.image_result(img)
+            b64 = await self.image_cache.get(img) if self.image_cache else None
+            if b64:
+                yield event.chain_result([Image.fromBase64(b64)])
+            else:
+                yield event.image_result(img)
         else:
             logger.warning("[戳一戳] 表情包池为空，无法发送图片")
             yield None
 
-    async def respond_record(self, event: AiocqhttpMessageEvent):
+    async def respond_record(self, event: AiocqhttpMessageEvent, ctx: PokeContext):
         """回复语音"""
-        audio_path = self.cfg.get_record()
+        audio_path = self.voice_cache.get(self.cfg.get_record())
         if audio_path:
             yield event.chain_result([Record(file=audio_path, url=audio_path)])
         else:
             logger.warning("[戳一戳] 语音池为空，无法发送语音")
             yield None
 
-    async def respond_ban(self, event: AiocqhttpMessageEvent):
-        """禁言"""
-        cfg = self.cfg.ban
-        try:
-            await event.bot.set_group_ban(
-                group_id=int(event.get_group_id()),
-                user_id=int(event.get_sender_id()),
-                duration=self.cfg.get_ban_time(),
-            )
-            template = cfg.ban_template
-
-        except Exception:
-            template = cfg.ban_fail_template
-        finally:
-            prompt = await self.llm.build_prompt(event, template)
-            conversation = await self.llm.get_conversation(event)
-            yield event.request_llm(prompt=prompt, conversation=conversation)
+    async def respond_ban(self, event: AiocqhttpMessageEvent, ctx: PokeContext):
+        """禁言（禁言本身在预取阶段与昵称、对话查询并发执行）"""
+        cfg = self.cfg.snap.ban
+        template = cfg.ban_template if ctx.banned else cfg.ban_fail_template
+        prompt = template.format(username=ctx.username)
+        LLM_REQUESTS.inc("realtime", "requested")
+        yield event.request_llm(prompt=prompt, conversation=ctx.conversation)
 
-    async def respond_cmd(self, event: AiocqhttpMessageEvent):
+    async def respond_cmd(self, event: AiocqhttpMessageEvent, ctx: PokeContext):
         """调用命令"""
         evt = copy.copy(event)
         evt.message_obj = copy.copy(event.message_obj)
@@ -0,0 +1,70 @@
+# core/pacing.py
+from __future__ import annotations
+
+import math
+import time
+
+
+class AimdPacer:
+    """
+    发戳间隔的自适应调节（AIMD：加性增、乘性减）
+
+    - 每次成功且耗时不超过 latency_target：速率加 _INCREASE 次/秒
+    - 失败或耗时超标：间隔翻倍（速率减半）；一次往返内只减一次，
+      避免流水线里同一批失败把速率连续砍到底
+    - 间隔始终限制在 [floor, ceiling]；floor 为 0 表示不限速，被减速时从 _MIN_CUT 起步
+    """
+
+    __slots__ = (
+        "interval",
+        "floor",
+        "ceiling",
+        "latency_target",
+        "increases",
+        "decreases",
+        "_cut_at",
+        "_clock",
+    )
+
+    _INCREASE = 0.1  # 次/秒
+    _DECREASE = 0.5
+    _MIN_CUT = 0.1  # 秒
+
+    def __init__(
+        self, start: float, floor: float, ceiling: float, latency_target: float
+    ):
+        self.floor = max(0.0, floor)
+        self.ceiling = max(self.floor, ceiling, self._MIN_CUT)
+        self.interval = min(self.ceiling, max(self.floor, start))
+        self.latency_target = latency_target
+        self._cut_at = -math.inf
+        self._clock = time.monotonic
+
+        # 统计
+        self.increases = 0
+        self.decreases = 0
+
+    @property
+    def rate(self) -> float:
+        """当前速率（次/秒），不限速时为 inf"""
+        return 1.0 / self.interval if self.interval else math.inf
+
+    def on_success(self, latency: float) -> None:
+        if latency > self.latency_target:
+            self._cut(latency)
+        elif self.interval > self.floor:
+            self.interval = max(self.floor, 1.0 / (self.rate + self._INCREASE))
+            self.increases += 1
+
+    def on_failure(self, latency: float) -> None:
+        self._cut(latency)
+
+    def _cut(self, latency: float) -> None:
+        now = self._clock()
+        if now - self._cut_at < max(latency, self.interval):
+            return
+        self._cut_at = now
+        self.interval = min(
+            self.ceiling, max(self.interval / self._DECREASE, self._MIN_CUT)
+        )
+        self.decreases += 1
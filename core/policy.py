@@ -0,0 +1,123 @@
+# core/policy.py
+from __future__ import annotations
+
+import random
+from collections.abc import Collection, Mapping, Sequence
+from typing import Generic, TypeVar
+
+from .model import PokeModel
+
+T = TypeVar("T")
+
+
+class AliasTable(Generic[T]):
+    """
+    Walker 别名表：按权重 O(1) 抽样
+
+    构造时 O(n) 预处理，sample 只需一次随机数和一次比较
+    """
+
+    __slots__ = ("items", "_prob", "_alias")
+
+    def __init__(self, items: Sequence[T], weights: Sequence[float]):
+        pairs = [(item, float(w)) for item, w in zip(items, weights) if w > 0]
+        self.items: tuple[T, ...] = tuple(item for item, _ in pairs)
+        n = len(pairs)
+        self._prob = [1.0] * n
+        self._alias = list(range(n))
+        if not n:
+            return
+
+        total = sum(w for _, w in pairs)
+        scaled = [w * n / total for _, w in pairs]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, g = small.pop(), large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = g
+            scaled[g] -= 1.0 - scaled[s]
+            (small if scaled[g] < 1.0 else large).append(g)
+        # 浮点误差残留的桶概率视为 1
+        for i in small + large:
+            self._prob[i] = 1.0
+
+    def __bool__(self) -> bool:
+        return bool(self.items)
+
+    def sample(self) -> T:
+        u = random.random() * len(self.items)
+        i = int(u)
+        return self.items[i] if u - i < self._prob[i] else self.items[self._alias[i]]
+
+
+class ResponsePolicy:
+    """
+    响应模块选择策略：全局权重表 + 按群覆盖的权重表
+
+    每张表另备一份只含廉价模块的降载表，群内压力过大时改从降载表抽取。
+    整个对象在配置编译时一次性构建，之后只读；
+    配置变更时构建新对象整体替换
+    """
+
+    __slots__ = ("default", "groups", "cheap_default", "cheap_groups")
+
+    def __init__(
+        self,
+        weights: Mapping[PokeModel, int],
+        group_weights: Mapping[int, Mapping[PokeModel, int]] | None = None,
+        cheap: Collection[PokeModel] = (),
+    ):
+        def build(w: Mapping[PokeModel, int]) -> AliasTable[PokeModel]:
+            return AliasTable(list(w), list(w.values()))
+
+        def build_cheap(w: Mapping[PokeModel, int]) -> AliasTable[PokeModel]:
+            return build({m: v for m, v in w.items() if m in cheap})
+
+        self.default: AliasTable[PokeModel] = build(weights)
+        self.cheap_default: AliasTable[PokeModel] = build_cheap(weights)
+        self.groups: dict[int, AliasTable[PokeModel]] = {}
+        self.cheap_groups: dict[int, AliasTable[PokeModel]] = {}
+        for gid, override in (group_weights or {}).items():
+            merged = {**weights, **override}
+            self.groups[gid] = build(merged)
+            self.cheap_groups[gid] = build_cheap(merged)
+
+    def table_for(
+        self, group_id: int | None, cheap: bool = False
+    ) -> AliasTable[PokeModel]:
+        groups, default = (
+            (self.cheap_groups, self.cheap_default)
+            if cheap
+            else (self.groups, self.default)
+        )
+        if group_id:
+            table = groups.get(group_id)
+            if table is not None:
+                return table
+        return default
+
+    def pick(self, group_id: int | None, cheap: bool = False) -> PokeModel | None:
+        """为某群抽取一个响应模块（cheap 时只抽廉价模块），无可用模块时返回 None"""
+        table = self.table_for(group_id, cheap)
+        return table.sample() if table else None
+
+
+def parse_group_weights(lines: Sequence[str]) -> dict[int, dict[PokeModel, int]]:
+    """
+    解析按群权重配置，每行格式：群号:模块=权重,模块=权重
+    例如 123456:llm=0,ban=30
+    """
+    result: dict[int, dict[PokeModel, int]] = {}
+    for line in lines:
+        try:
+            gid, spec = str(line).split(":", 1)
+            override = result.setdefault(int(gid.strip()), {})
+            for item in spec.split(","):
+                if not item.strip():
+                    continue
+                name, weight = item.split("=", 1)
+                override[PokeModel(name.strip())] = max(0, int(weight))
+        except ValueError as e:
+            raise ValueError(f"按群权重配置格式错误: {line}") from e
+    return result
@@ -0,0 +1,116 @@
+# core/pressure.py
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from enum import IntEnum
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .config import LoadShedConfig
+
+
+class Pressure(IntEnum):
+    NORMAL = 0  # 正常按权重响应
+    SHED = 1  # 只用廉价模块响应
+    DROP = 2  # 不响应
+
+    def __str__(self) -> str:
+        return self.name.lower()
+
+
+class GroupPressure:
+    """
+    每群戳频估计与分级降载
+
+    - 滑动窗口用两个相邻计数桶近似：rate = 本桶计数 + 上桶计数 × 上桶剩余占比，
+      每群 O(1) 内存、O(1) 更新
+    - rate 达到 shed_rate 进入 SHED，达到 drop_rate 进入 DROP；
+      降级需 rate 回落到阈值的 _HYSTERESIS 倍以下，避免在阈值附近抖动
+    - 最多跟踪 max_groups 个群（LRU）
+    """
+
+    _HYSTERESIS = 0.8
+
+    def __init__(self, config: LoadShedConfig, max_groups: int = 1024):
+        self.window = max(1.0, float(config.window))
+        self.shed_rate = max(1, config.shed_rate)
+        self.drop_rate = max(self.shed_rate, config.drop_rate)
+        self.max_groups = max(1, max_groups)
+        # 群号 → [本桶起点, 本桶计数, 上桶计数, 当前等级]
+        self._groups: OrderedDict[int, list] = OrderedDict()
+        self._clock = time.monotonic
+
+        # 统计
+        self.shed = 0
+        self.dropped = 0
+
+    def _rate(self, state: list, now: float) -> float:
+        start, cur, prev = state[0], state[1], state[2]
+        elapsed = now - start
+        if elapsed >= self.window:
+            # 滚动到新桶；空了两个窗口以上则上桶也清零
+            prev = cur if elapsed < 2 * self.window else 0
+            start += (elapsed // self.window) * self.window
+            state[0], state[1], state[2] = start, 0, prev
+            cur, elapsed = 0, now - start
+        return cur + prev * (1.0 - elapsed / self.window)
+
+    def _classify(self, rate: float, scale: float = 1.0) -> Pressure:
+        if rate >= self.drop_rate * scale:
+            return Pressure.DROP
+        if rate >= self.shed_rate * scale:
+            return Pressure.SHED
+        return Pressure.NORMAL
+
+    def _level(self, state: list, rate: float) -> Pressure:
+        # 升级立即生效；降级只降到回落阈值所允许的等级
+        level = max(
+            self._classify(rate),
+            min(state[3], self._classify(rate, self._HYSTERESIS)),
+        )
+        state[3] = level
+        return level
+
+    def hit(self, group_id: int) -> Pressure:
+        """记录一次群内戳一戳，返回该群当前压力等级"""
+        now = self._clock()
+        state = self._groups.get(group_id)
+        if state is None:
+            state = self._groups[group_id] = [now, 0, 0, Pressure.NORMAL]
+            if len(self._groups) > self.max_groups:
+                self._groups.popitem(last=False)
+        else:
+            self._groups.move_to_end(group_id)
+        rate = self._rate(state, now)
+        state[1] += 1
+        level = self._level(state, rate + 1)
+        if level is Pressure.SHED:
+            self.shed += 1
+        elif level is Pressure.DROP:
+            self.dropped += 1
+        return level
+
+    def level(self, group_id: int) -> Pressure:
+        """某群当前压力等级（不计数）"""
+        state = self._groups.get(group_id)
+        if state is None:
+            return Pressure.NORMAL
+        return self._level(state, self._rate(state, self._clock()))
+
+    def hottest(self, n: int = 10) -> list[tuple[int, float, Pressure]]:
+        """戳频最高的 n 个群：(群号, 窗口内戳数, 等级)"""
+        now = self._clock()
+        rows = []
+        for gid, state in self._groups.items():
+            rate = self._rate(state, now)
+            rows.append((gid, rate, self._level(state, rate)))
+        rows.sort(key=lambda r: r[1], reverse=True)
+        return rows[:n]
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "groups": len(self._groups),
+            "shed": self.shed,
+            "dropped": self.dropped,
+        }
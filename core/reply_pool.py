@@ -0,0 +1,155 @@
+# core/reply_pool.py
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+
+from astrbot.api import logger
+from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
+    AiocqhttpMessageEvent,
+)
+from astrbot.core.star.context import Context
+
+from .llm import LLMService
+from .metrics import LLM_REQUESTS, LLM_SECONDS
+
+# 预生成时代替用户名的占位符，取用时替换为真实昵称
+NAME_TOKEN = "{username}"
+
+
+class LLMReplyPool:
+    """
+    LLM 回复预生成池
+
+    - 每个会话（unified_msg_origin，对应各自的人格）一个回复池
+    - 被戳时直接从池中取一条，替换用户名后发送
+    - 取用后由后台任务补充，全局并发受 max_concurrency 限制
+    - 最多保留 max_sessions 个会话的池（LRU）
+    """
+
+    def __init__(
+        self,
+        context: Context,
+        llm: LLMService,
+        size: int,
+        max_concurrency: int = 2,
+        max_sessions: int = 256,
+    ):
+        self.context = context
+        self.llm = llm
+        self.size = max(1, size)
+        self.max_sessions = max(1, max_sessions)
+        self._pools: OrderedDict[str, deque[str]] = OrderedDict()
+        self._refilling: dict[str, asyncio.Task] = {}
+        self._sem = asyncio.Semaphore(max_concurrency)
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.failures = 0
+        self.last_refill_ms = 0.0
+        self._refill_ms_total = 0.0
+
+    def has(self, umo: str) -> bool:
+        """该会话池中是否有可用回复"""
+        return bool(self._pools.get(umo))
+
+    def take(self, umo: str) -> str | None:
+        """取一条预生成回复，池空返回 None"""
+        pool = self._pools.get(umo)
+        if pool:
+            self._pools.move_to_end(umo)
+            self.hits += 1
+            return pool.popleft()
+        self.misses += 1
+        return None
+
+    def refill(self, event: AiocqhttpMessageEvent, template: str) -> None:
+        """后台补满该会话的回复池（已在补充中则忽略）"""
+        umo = event.unified_msg_origin
+        task = self._refilling.get(umo)
+        if task is not None and not task.done():
+            return
+        task = asyncio.create_task(self._refill(event, template))
+        self._refilling[umo] = task
+        task.add_done_callback(lambda _: self._refilling.pop(umo, None))
+
+    async def _refill(self, event: AiocqhttpMessageEvent, template: str) -> None:
+        umo = event.unified_msg_origin
+        pool = self._pools.get(umo)
+        if pool is None:
+            pool = self._pools[umo] = deque(maxlen=self.size)
+            if len(self._pools) > self.max_sessions:
+                self._pools.popitem(last=False)
+
+        system_prompt = await self._system_prompt(event)
+        prompt = (
+            template.format(username=NAME_TOKEN)
+            + f"\n（请在回复中原样保留 {NAME_TOKEN} 来指代对方，只输出回复内容）"
+        )
+        while len(pool) < self.size:
+            provider = self.context.get_using_provider(umo)
+            if provider is None:
+                return
+            async with self._sem:
+                start = time.perf_counter()
+                try:
+                    resp = await provider.text_chat(
+                        prompt=prompt, system_prompt=system_prompt
+                    )
+                except Exception as e:
+                    self.failures += 1
+                    LLM_REQUESTS.inc("refill", "error")
+                    logger.warning(f"[戳一戳] 预生成 LLM 回复失败: {e}")
+                    return
+                elapsed = (time.perf_counter() - start) * 1000
+            LLM_SECONDS.observe(elapsed / 1000, "refill")
+            text = (resp.completion_text or "").strip()
+            if not text:
+                self.failures += 1
+                LLM_REQUESTS.inc("refill", "empty")
+                return
+            LLM_REQUESTS.inc("refill", "ok")
+            pool.append(text)
+            self.refills += 1
+            self.last_refill_ms = elapsed
+            self._refill_ms_total += elapsed
+
+    async def _system_prompt(self, event: AiocqhttpMessageEvent) -> str:
+        """当前会话所用人格的系统提示词"""
+        try:
+            conversation = await self.llm.get_conversation(event)
+            persona_id = getattr(conversation, "persona_id", None)
+            mgr = self.context.persona_manager
+            if persona_id and persona_id != "[%None]":
+                persona = await mgr.get_persona(persona_id)
+                return persona.system_prompt or ""
+            persona = await mgr.get_default_persona_v3(event.unified_msg_origin)
+            return persona.get("prompt", "") if persona else ""
+        except Exception as e:
+            logger.debug(f"[戳一戳] 获取人格失败，使用空系统提示词: {e}")
+            return ""
+
+    async def close(self) -> None:
+        tasks = list(self._refilling.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "sessions": len(self._pools),
+            "depth": sum(len(p) for p in self._pools.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "refills": self.refills,
+            "failures": self.failures,
+            "last_refill_ms": round(self.last_refill_ms, 1),
+            "avg_refill_ms": (
+                round(self._refill_ms_total / self.refills, 1) if self.refills else 0.0
+            ),
+        }
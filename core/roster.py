@@ -0,0 +1,117 @@
+# core/roster.py
+from __future__ import annotations
+
+import random
+import time
+from array import array
+from collections import OrderedDict
+
+from aiocqhttp import CQHttp
+
+from astrbot.api import logger
+
+from .cache import SingleFlight
+
+
+class _Roster:
+    """单个群的成员表（紧凑的 int64 数组）"""
+
+    __slots__ = ("ids", "loaded_at")
+
+    def __init__(self, ids: array, loaded_at: float):
+        self.ids = ids
+        self.loaded_at = loaded_at
+
+    def add(self, uid: int) -> None:
+        if uid not in self.ids:
+            self.ids.append(uid)
+
+    def remove(self, uid: int) -> None:
+        try:
+            i = self.ids.index(uid)
+        except ValueError:
+            return
+        # 与末尾交换后弹出，O(1) 删除
+        last = self.ids.pop()
+        if i < len(self.ids):
+            self.ids[i] = last
+
+
+class GroupRosterCache:
+    """
+    群成员表缓存
+
+    - 首次使用时调用 get_group_member_list 拉取一次
+    - 之后由 group_increase / group_decrease 通知增量维护
+    - 超过 max_age 的成员表在下次使用时重新拉取
+    - 最多缓存 max_groups 个群（LRU）
+    """
+
+    def __init__(self, max_age: float = 6 * 3600, max_groups: int = 512):
+        self.max_age = max_age
+        self.max_groups = max(1, max_groups)
+        self._rosters: OrderedDict[int, _Roster] = OrderedDict()
+        self._flight: SingleFlight[int, _Roster | None] = SingleFlight()
+        self._clock = time.monotonic
+
+    async def _load(self, client: CQHttp, group_id: int) -> _Roster | None:
+        try:
+            members = await client.get_group_member_list(group_id=group_id)
+        except Exception as e:
+            logger.error(f"获取群成员信息失败：{e}")
+            return None
+
+        ids = array("q")
+        for member in members or []:
+            uid = member.get("user_id")
+            if uid:
+                ids.append(int(uid))
+        roster = _Roster(ids, self._clock())
+        self._rosters[group_id] = roster
+        self._rosters.move_to_end(group_id)
+        if len(self._rosters) > self.max_groups:
+            self._rosters.popitem(last=False)
+        return roster
+
+    async def get(self, client: CQHttp, group_id: int | str) -> _Roster | None:
+        """获取群成员表，缺失或过期时重新拉取"""
+        gid = int(group_id)
+        roster = self._rosters.get(gid)
+        if roster is not None and self._clock() - roster.loaded_at < self.max_age:
+            self._rosters.move_to_end(gid)
+            return roster
+        return await self._flight.do(gid, lambda: self._load(client, gid))
+
+    async def sample(
+        self, client: CQHttp, group_id: int | str, num: int = 200
+    ) -> list[int]:
+        """随机抽取至多 num 个群成员 ID"""
+        roster = await self.get(client, group_id)
+        if not roster:
+            return []
+        return random.sample(roster.ids, min(num, len(roster.ids)))
+
+    # ========== 通知增量维护 ==========
+
+    def on_increase(self, group_id: int | str, user_id: int | str) -> None:
+        roster = self._rosters.get(int(group_id))
+        if roster is not None:
+            roster.add(int(user_id))
+
+    def on_decrease(
+        self, group_id: int | str, user_id: int | str, self_id: int | str
+    ) -> None:
+        gid = int(group_id)
+        if int(user_id) == int(self_id):
+            # 机器人自己退群/被踢，整张表作废
+            self._rosters.pop(gid, None)
+            return
+        roster = self._rosters.get(gid)
+        if roster is not None:
+            roster.remove(int(user_id))
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "groups": len(self._rosters),
+            "members": sum(len(r.ids) for r in self._rosters.values()),
+        }
@@ -1,36 +1,59 @@
 # core/scheduler.py
 from __future__ import annotations
 
-from aiocqhttp import CQHttp
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 from astrbot.api import logger
 
+from .accounts import AccountRouter
 from .config import PluginConfig
+from .model import ScheduleJob
 from .send_poke import PokeSender
 
 
+@dataclass
+class RunReport:
+    """单次定时任务执行报告"""
+
+    job: str
+    started_at: float
+    duration: float = 0.0
+    groups: int = 0
+    sent: int = 0
+    failed: int = 0
+    skipped: str = ""
+
+
 class PokeScheduler:
     """
     定时戳调度器
+
+    - 支持多个命名任务，各自的 cron、目标、次数
+    - 触发时按群分片，最多 max_concurrency 个群同时发送，每群随机延迟 jitter
+    - 错过触发时间在 misfire_grace 内补触发，多次错过合并为一次；
+      上一次未跑完时不会重入
+    - 每个群由 AccountRouter 挑选在该群且最空闲的账号发送
     """
 
-    def __init__(self, config: PluginConfig, sender: PokeSender):
+    def __init__(
+        self, config: PluginConfig, sender: PokeSender, router: AccountRouter
+    ):
         self.cfg = config.scheduler
-        self.cron = self.cfg.cron
-        self.target_list = config.target_list
+        self.jobs = config.schedule_jobs
         self.sender = sender
+        self.router = router
 
         self._scheduler = AsyncIOScheduler()
         self._started = False
-        self._job_id = "scheduler_poke"
-
-        self.client: CQHttp | None = None
+        self._job_prefix = "scheduler_poke"
 
-    def set_client(self, client: CQHttp):
-        if not self.client:
-            self.client = client
+        self.reports: dict[str, RunReport] = {}
 
     # ========== 生命周期 ==========
 
@@ -38,7 +61,8 @@ class PokeScheduler:
         if self._started:
             return
 
-        self._register_job()
+        for job in self.jobs:
+            self._register_job(job)
         self._scheduler.start()
         self._started = True
 
@@ -49,28 +73,80 @@ class PokeScheduler:
         self._scheduler.shutdown(wait=False)
         self._started = False
 
-    def _register_job(self):
+    def _register_job(self, job: ScheduleJob):
         try:
-            trigger = CronTrigger.from_crontab(self.cron)
+            trigger = CronTrigger.from_crontab(job.cron)
         except Exception as e:
-            logger.error(f"cron 无效: {self.cron}, {e}")
+            logger.error(f"定时戳任务 {job.name} 的 cron 无效: {job.cron}, {e}")
             return
         self._scheduler.add_job(
             self._on_trigger,
             trigger=trigger,
-            id=self._job_id,
+            args=(job,),
+            id=f"{self._job_prefix}:{job.name}",
             replace_existing=True,
+            coalesce=True,
+            max_instances=1,
+            misfire_grace_time=max(1, self.cfg.misfire_grace),
         )
-        logger.debug(f"已注册定时戳任务，Cron: {self.cron}")
+        logger.debug(f"已注册定时戳任务 {job.name}，Cron: {job.cron}")
 
-    async def _on_trigger(self) -> None:
-        if not self.client:
-            return
-        for target in self.target_list:
-            gid, uid = target
-            await self.sender.client_send(
-                client=self.client,
-                target_ids=uid,
-                group_id=gid,
-                times=self.cfg.times,
+    # ========== 执行 ==========
+
+    async def _on_trigger(self, job: ScheduleJob) -> None:
+        report = RunReport(job=job.name, started_at=time.time())
+        start = time.perf_counter()
+        try:
+            await self._fan_out(job, report)
+        finally:
+            report.duration = time.perf_counter() - start
+            self.reports[job.name] = report
+            logger.info(
+                f"定时戳任务 {job.name} 完成：{report.groups} 个群，"
+                f"成功 {report.sent}，失败 {report.failed}，"
+                f"耗时 {report.duration:.1f}s"
+                + (f"，跳过：{report.skipped}" if report.skipped else "")
             )
+
+    async def _fan_out(self, job: ScheduleJob, report: RunReport) -> None:
+        if not self.router.accounts:
+            report.skipped = "尚未获取到 client"
+            return
+
+        # 按群分片：同群的目标交给同一条发送队列
+        shards: dict[str, list[str]] = {}
+        for gid, uid in job.targets:
+            shards.setdefault(gid, []).append(uid)
+        report.groups = len(shards)
+
+        sem = asyncio.Semaphore(max(1, self.cfg.max_concurrency))
+        jitter = max(0.0, self.cfg.jitter)
+
+        async def run_shard(gid: str, uids: list[str]) -> None:
+            try:
+                await send_shard(gid, uids)
+            except Exception as e:
+                logger.error(f"定时戳任务 {job.name} 在群 {gid} 发戳出错：{e}")
+                report.failed += len(uids) * job.times
+
+        async def send_shard(gid: str, uids: list[str]) -> None:
+            if jitter:
+                await asyncio.sleep(random.uniform(0, jitter))
+            async with sem:
+                route = await self.router.pick(gid)
+                if route is None:
+                    logger.warning(f"定时戳任务 {job.name}：没有账号在群 {gid} 中")
+                    report.failed += len(uids) * job.times
+                    return
+                self_id, client = route
+                ticket = await self.sender.client_send(
+                    client=client,
+                    target_ids=uids,
+                    group_id=gid,
+                    times=job.times,
+                    self_id=self_id,
+                )
+            report.sent += ticket.sent
+            report.failed += ticket.failed
+
+        await asyncio.gather(*(run_shard(gid, uids) for gid, uids in shards.items()))
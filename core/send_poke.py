@@ -1,5 +1,7 @@
 import asyncio
-from collections.abc import Sequence
+import time
+from collections.abc import Generator, Sequence
+from typing import Any
 
 from aiocqhttp import CQHttp
 
@@ -8,12 +10,96 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from .breaker import BreakerState, CircuitBreaker, counts_as_failure
 from .config import PluginConfig
+from .metrics import API_FAILURES, API_SECONDS, POKE_BREAKER_TRIPS
+from .pacing import AimdPacer
+
+
+class PokeTicket:
+    """
+    发戳回执：入队即返回，需要等待完成时 await 本对象即可。
+
+    await 的结果是回执自身，可通过 sent / failed 查看结果，
+    发戳失败不会抛异常。
+    """
+
+    __slots__ = ("total", "sent", "failed", "_future")
+
+    def __init__(self, total: int):
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self._future: asyncio.Future = asyncio.get_running_loop().create_future()
+        if total <= 0:
+            self._future.set_result(self)
+
+    def _settle(self, ok: bool, n: int = 1) -> None:
+        if ok:
+            self.sent += n
+        else:
+            self.failed += n
+        if self.sent + self.failed >= self.total and not self._future.done():
+            self._future.set_result(self)
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def __await__(self) -> Generator[Any, None, "PokeTicket"]:
+        return self._future.__await__()
+
+
+class _RateBudget:
+    """最小间隔预算：保证相邻两次发放之间至少间隔 interval 秒"""
+
+    __slots__ = ("_next_at",)
+
+    def __init__(self):
+        self._next_at = 0.0
+
+    def reserve(self, interval: float) -> float:
+        """预约下一个时隙，返回需要等待的秒数"""
+        now = asyncio.get_running_loop().time()
+        at = max(now, self._next_at)
+        self._next_at = at + interval
+        return at - now
+
+
+# 队列元素：(client, self_id, user_id, group_id, ticket)
+_PokeJob = tuple[CQHttp, str | None, int | str, int | str | None, PokeTicket]
 
 
 class PokeSender:
+    """
+    发戳调度器
+
+    - 每个 (账号, 群) 一条队列和一个 worker，不同群之间并行发送
+    - 同一群内按 poke_interval 间隔发送（防风控）
+    - 同一账号的所有群共享 poke_account_interval 间隔预算
+    - 开启 poke_pacing.adaptive 时两种间隔都按回执耗时和失败自适应（AIMD），
+      分别以 poke_interval / poke_account_interval 为起点
+    - 每个 (账号, 群) 一个熔断器：连续失败后打开，队列中剩余的戳立即判失败，
+      退避后再放一次探测
+    - 开启 poke_pipeline 时按时隙发出、不等回执（每条队列最多
+      poke_max_inflight 个在途），N 次戳约耗时 N × 间隔 + RTT
+      而非 N × max(间隔, RTT)
+    - worker 空闲一段时间后自动退出
+    """
+
+    _WORKER_IDLE_TIMEOUT = 30.0
+    # 熔断器多久没有发戳就丢弃（账号下线等情况下不会再有流量）
+    _BREAKER_TTL = 3600.0
+
     def __init__(self, config: PluginConfig):
         self.cfg = config
+        self._queues: dict[tuple[str, int], asyncio.Queue[_PokeJob]] = {}
+        self._workers: dict[tuple[str, int], asyncio.Task] = {}
+        self._account_budgets: dict[str, _RateBudget] = {}
+        self._pending: dict[str, int] = {}
+        self._inflight: set[asyncio.Task] = set()
+        self._breakers: dict[tuple[str, int], CircuitBreaker] = {}
+        self._group_pacers: dict[tuple[str, int], AimdPacer] = {}
+        self._account_pacers: dict[str, AimdPacer] = {}
 
     # ========= 内部工具 =========
 
@@ -39,6 +125,211 @@ class PokeSender:
         result = int(value)
         return result if result != 0 else None
 
+    @staticmethod
+    def _account_key(client: CQHttp, self_id: str | None) -> str:
+        return str(self_id) if self_id else f"client:{id(client)}"
+
+    def pending(self, self_id: str) -> int:
+        """某账号尚未发出的戳数"""
+        return self._pending.get(str(self_id), 0)
+
+    def _breaker(self, key: tuple[str, int]) -> CircuitBreaker | None:
+        conf = self.cfg.snap.poke_breaker
+        if not conf.enabled:
+            return None
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            self._prune_breakers()
+            breaker = self._breakers[key] = CircuitBreaker(
+                conf.threshold, conf.backoff, conf.max_backoff
+            )
+        return breaker
+
+    def _pacers(self, key: tuple[str, int]) -> tuple[AimdPacer, AimdPacer] | None:
+        """(群间隔, 账号间隔) 的自适应调节器；未开启自适应时为 None"""
+        snap = self.cfg.snap
+        conf = snap.poke_pacing
+        if not conf.adaptive:
+            return None
+        group = self._group_pacers.get(key)
+        if group is None:
+            group = self._group_pacers[key] = AimdPacer(
+                snap.poke_interval,
+                conf.min_interval,
+                conf.max_interval,
+                conf.latency_target,
+            )
+        account = self._account_pacers.get(key[0])
+        if account is None:
+            account = self._account_pacers[key[0]] = AimdPacer(
+                snap.poke_account_interval,
+                snap.poke_account_interval,
+                conf.max_interval,
+                conf.latency_target,
+            )
+        return group, account
+
+    def _queue_key(
+        self, client: CQHttp, self_id: str | None, group_id: int | str | None
+    ) -> tuple[str, int]:
+        account = self._account_key(client, self_id)
+        try:
+            gid = self._normalize_id(group_id) or 0
+        except ValueError:
+            gid = 0
+        return account, gid
+
+    def _enqueue(
+        self,
+        client: CQHttp,
+        self_id: str | None,
+        target_ids: Sequence[str | int],
+        group_id: int | str | None,
+        times: int,
+    ) -> PokeTicket:
+        ticket = PokeTicket(len(target_ids) * max(times, 0))
+        if ticket.done():
+            return ticket
+
+        key = self._queue_key(client, self_id, group_id)
+        breaker = self._breakers.get(key)
+        if breaker is not None and breaker.rejecting():
+            breaker.rejected += ticket.total
+            ticket._settle(False, ticket.total)
+            return ticket
+
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue()
+        for tid in target_ids:
+            for _ in range(times):
+                queue.put_nowait((client, self_id, tid, group_id, ticket))
+        self._pending[key[0]] = self._pending.get(key[0], 0) + ticket.total
+
+        worker = self._workers.get(key)
+        if worker is None or worker.done():
+            self._workers[key] = asyncio.create_task(self._worker(key, queue))
+        return ticket
+
+    async def _worker(self, key: tuple[str, int], queue: asyncio.Queue[_PokeJob]):
+        account = key[0]
+        breaker = self._breaker(key)
+        group_budget = _RateBudget()
+        account_budget = self._account_budgets.setdefault(account, _RateBudget())
+        inflight = asyncio.Semaphore(max(1, self.cfg.snap.poke_max_inflight))
+        while True:
+            try:
+                job = await asyncio.wait_for(queue.get(), self._WORKER_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    self._queues.pop(key, None)
+                    self._workers.pop(key, None)
+                    if breaker is not None and breaker.idle:
+                        self._breakers.pop(key, None)
+                    self._group_pacers.pop(key, None)
+                    if not any(k[0] == account for k in self._queues):
+                        self._account_pacers.pop(account, None)
+                    return
+                continue
+
+            # 熔断中：本戳和队列里剩余的戳立即判失败，不占发送时隙
+            if breaker is not None and not breaker.allow():
+                self._drain(job, queue, account, breaker)
+                continue
+
+            snap = self.cfg.snap
+            pacers = self._pacers(key)
+            if pacers:
+                group_interval = pacers[0].interval
+                account_interval = pacers[1].interval
+            else:
+                group_interval = snap.poke_interval
+                account_interval = snap.poke_account_interval
+            # 熔断探测总是等回执，结果出来之前不发后面的戳
+            pipeline = snap.poke_pipeline and not (
+                breaker is not None and breaker.state is BreakerState.HALF_OPEN
+            )
+            try:
+                await asyncio.sleep(group_budget.reserve(group_interval))
+                await asyncio.sleep(account_budget.reserve(account_interval))
+                if pipeline:
+                    await inflight.acquire()
+            except asyncio.CancelledError:
+                job[-1]._settle(False)
+                self._pending[account] -= 1
+                raise
+
+            if not pipeline:
+                await self._send(job, account, breaker, pacers)
+                continue
+
+            # 流水线：按时隙发出后不等回执，回执由后台任务异步结算
+            task = asyncio.create_task(self._send(job, account, breaker, pacers))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+            task.add_done_callback(lambda _: inflight.release())
+
+    def _drain(
+        self,
+        job: _PokeJob,
+        queue: asyncio.Queue[_PokeJob],
+        account: str,
+        breaker: CircuitBreaker,
+    ):
+        """把本戳和队列中剩余的戳全部判失败"""
+        job[-1]._settle(False)
+        n = 1
+        while not queue.empty():
+            queue.get_nowait()[-1]._settle(False)
+            n += 1
+        self._pending[account] -= n
+        # 本戳已在 breaker.allow() 中计入
+        breaker.rejected += n - 1
+
+    async def _send(
+        self,
+        job: _PokeJob,
+        account: str,
+        breaker: CircuitBreaker | None = None,
+        pacers: tuple[AimdPacer, ...] | None = None,
+    ) -> None:
+        """发出一次戳并结算回执"""
+        client, self_id, tid, group_id, ticket = job
+        start = time.perf_counter()
+        try:
+            await self.poke_func(
+                client=client,
+                user_id=tid,
+                group_id=group_id,
+                self_id=self_id,
+            )
+            ticket._settle(True)
+            if breaker is not None:
+                breaker.record_success()
+            if pacers:
+                latency = time.perf_counter() - start
+                for pacer in pacers:
+                    pacer.on_success(latency)
+        except asyncio.CancelledError:
+            ticket._settle(False)
+            raise
+        except Exception as e:
+            logger.warning(f"戳一戳失败 user_id={tid}: {e}")
+            ticket._settle(False)
+            counted = counts_as_failure(e)
+            if pacers and counted:
+                latency = time.perf_counter() - start
+                for pacer in pacers:
+                    pacer.on_failure(latency)
+            if breaker is not None and breaker.record_failure(counted):
+                POKE_BREAKER_TRIPS.inc()
+                logger.warning(
+                    f"[戳一戳] 账号 {account} 在群 {group_id} 连续发戳失败，"
+                    f"暂停 {breaker.retry_in():.0f} 秒"
+                )
+        finally:
+            self._pending[account] -= 1
+
     # ========= 核心方法 =========
 
     @classmethod
@@ -47,6 +338,7 @@ class PokeSender:
         client: CQHttp,
         user_id: int | str,
         group_id: int | str | None = None,
+        self_id: int | str | None = None,
     ):
         normalized_user_id = cls._normalize_id(user_id)
         if normalized_user_id is None:
@@ -54,65 +346,117 @@ class PokeSender:
 
         normalized_group_id = cls._normalize_id(group_id)
 
-        if normalized_group_id is not None:
-            await client.group_poke(
-                group_id=normalized_group_id,
-                user_id=normalized_user_id,
-            )
-        else:
-            await client.friend_poke(user_id=normalized_user_id)
+        # 多账号共用一个 client 时，self_id 用于选择连接
+        extra: dict[str, int] = {}
+        normalized_self_id = cls._normalize_id(self_id)
+        if normalized_self_id is not None:
+            extra["self_id"] = normalized_self_id
+
+        action = "group_poke" if normalized_group_id is not None else "friend_poke"
+        start = time.perf_counter()
+        try:
+            if normalized_group_id is not None:
+                await client.group_poke(
+                    group_id=normalized_group_id,
+                    user_id=normalized_user_id,
+                    **extra,
+                )
+            else:
+                await client.friend_poke(user_id=normalized_user_id, **extra)
+        except Exception:
+            API_FAILURES.inc(action)
+            raise
+        finally:
+            API_SECONDS.observe(time.perf_counter() - start, action)
 
     # ========= 事件发送 =========
 
-    async def event_send(
+    def event_send(
         self,
         event: AiocqhttpMessageEvent,
         *,
         target_ids: Sequence[str | int],
         times: int = 1,
-    ):
-        """从事件发送戳一戳"""
-        if not target_ids:
-            return
-
-        group_id = event.get_group_id()
-
-        for tid in target_ids:
-            for _ in range(times):
-                try:
-                    await self.poke_func(
-                        client=event.bot,
-                        user_id=tid,
-                        group_id=group_id,
-                    )
-                except Exception as e:
-                    logger.warning(f"戳一戳失败 user_id={tid}: {e}")
-
-                await asyncio.sleep(self.cfg.poke_interval)
+    ) -> PokeTicket:
+        """从事件发送戳一戳（入队即返回，await 返回值可等待发送完成）"""
+        return self._enqueue(
+            event.bot,
+            event.get_self_id(),
+            target_ids,
+            event.get_group_id(),
+            times,
+        )
 
     # ========= 直接 client 发送 =========
 
-    async def client_send(
+    def client_send(
         self,
         client: CQHttp,
         *,
         target_ids: Sequence[str | int],
         group_id: str | int | None = None,
         times: int = 1,
-    ):
-        """直接使用 client 发送戳一戳"""
-        if not target_ids:
-            return
+        self_id: str | None = None,
+    ) -> PokeTicket:
+        """直接使用 client 发送戳一戳（入队即返回，await 返回值可等待发送完成）"""
+        return self._enqueue(client, self_id, target_ids, group_id, times)
 
-        for tid in target_ids:
-            for _ in range(times):
-                try:
-                    await self.poke_func(
-                        client=client,
-                        user_id=tid,
-                        group_id=group_id,
-                    )
-                except Exception as e:
-                    logger.warning(f"戳一戳失败 user_id={tid}: {e}")
-
-                await asyncio.sleep(self.cfg.poke_interval)
+    # ========= 状态 =========
+
+    def forget_group(self, self_id: int | str, group_id: int | str) -> None:
+        """账号退群后丢弃对应的熔断器与间隔调节器"""
+        key = (str(self_id), int(group_id))
+        self._breakers.pop(key, None)
+        self._group_pacers.pop(key, None)
+
+    def _prune_breakers(self) -> None:
+        """丢弃长时间没有流量、且没有活动队列的熔断器"""
+        now = time.monotonic()
+        stale = [
+            key
+            for key, breaker in self._breakers.items()
+            if now - breaker.used_at > self._BREAKER_TTL and key not in self._workers
+        ]
+        for key in stale:
+            del self._breakers[key]
+
+    def breakers(self) -> list[tuple[str, int, CircuitBreaker]]:
+        """未处于正常状态的熔断器：(账号, 群号, 熔断器)"""
+        self._prune_breakers()
+        return [
+            (account, gid, breaker)
+            for (account, gid), breaker in self._breakers.items()
+            if not breaker.idle
+        ]
+
+    def pacers(self) -> list[tuple[str, int | None, AimdPacer]]:
+        """自适应调节器：(账号, 群号, 调节器)，群号为 None 的是账号级"""
+        return [
+            *((account, None, p) for account, p in self._account_pacers.items()),
+            *((account, gid, p) for (account, gid), p in self._group_pacers.items()),
+        ]
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "queues": len(self._queues),
+            "pending": sum(self._pending.values()),
+            "inflight": len(self._inflight),
+            "breakers": len(self.breakers()),
+            "trips": sum(b.trips for b in self._breakers.values()),
+        }
+
+    # ========= 生命周期 =========
+
+    async def close(self) -> None:
+        """取消所有 worker 和在途请求，未发送的戳按失败结算"""
+        tasks = [*self._workers.values(), *self._inflight]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for queue in self._queues.values():
+            while not queue.empty():
+                queue.get_nowait()[-1]._settle(False)
+        self._workers.clear()
+        self._queues.clear()
+        self._inflight.clear()
+        self._pending.clear()
@@ -0,0 +1,271 @@
+# core/shared_cooldown.py
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+if TYPE_CHECKING:
+    from .config import PluginConfig
+
+# 文件头：魔数、版本、槽位数、探测窗口
+_HEADER = struct.Struct("<4sIII")
+_MAGIC = b"PKCD"
+_VERSION = 1
+_HEADER_SIZE = 64
+
+# 槽位：序号（seqlock）、占位、群号、QQ号、最后触发时间（墙钟秒）
+_SLOT = struct.Struct("<Iiqqd")
+_SEQ = struct.Struct("<I")
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix(group_id: int, user_id: int) -> int:
+    """(群号, QQ号) → 64 位哈希（各进程一致，不依赖 PYTHONHASHSEED）"""
+    h = (group_id * 0x9E3779B97F4A7C15 ^ user_id) & _MASK64
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return h ^ (h >> 31)
+
+
+class SharedCooldown:
+    """
+    多进程共享的冷却器：同一台机器上的多个 bot 进程共用一份冷却状态
+
+    - 状态放在定长的内存映射文件里，按 (群号, QQ号) 哈希寻址，线性探测 probe 个槽位
+    - 读无锁：每个槽位带 seqlock 序号，读到奇数或前后不一致就重读；
+      重读 _READ_SPINS 次仍不一致（写者在两次序号递增之间崩溃）时加锁修复该槽位
+    - 写加锁：用 fcntl 锁住该键的探测窗口（字节区间锁），不同窗口的写互不阻塞
+    - 冷却中的连戳只走无锁读路径，不会进内核
+    - 探测窗口内没有空位或过期槽位时覆盖最旧的记录（计入 evictions）
+    - 接口与 Cooldown 一致，可直接替换
+    """
+
+    DEFAULT_SLOTS = 1 << 16
+    PROBE = 16
+    _READ_SPINS = 256
+
+    def __init__(
+        self,
+        config: PluginConfig,
+        path: Path,
+        slots: int = DEFAULT_SLOTS,
+        on_trigger: Callable[[int, int], None] | None = None,
+    ):
+        if fcntl is None:
+            raise OSError("当前平台不支持 fcntl，无法使用共享冷却")
+        self.cfg = config
+        self.cd: float = config.poke_cd
+        self.on_trigger = on_trigger
+        self.path = path
+        self.slots = max(self.PROBE, slots)
+        self._clock = time.time
+        self._fd, self._mm = self._open()
+
+        # 统计（仅本进程）
+        self.evictions = 0
+        self.retries = 0
+        self.repairs = 0
+
+    # ========== 文件 ==========
+
+    def _size(self) -> int:
+        # 尾部多留 probe 个槽位，探测窗口不必回绕
+        return _HEADER_SIZE + (self.slots + self.PROBE) * _SLOT.size
+
+    def _open(self) -> tuple[int, mmap.mmap]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            size = self._size()
+            # 初始化期间锁住整个文件，防止多个进程同时建表
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            try:
+                header = os.pread(fd, _HEADER.size, 0)
+                expected = _HEADER.pack(_MAGIC, _VERSION, self.slots, self.PROBE)
+                if header != expected or os.fstat(fd).st_size != size:
+                    # 新文件或槽位配置变化：清空重建
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, size)
+                    os.pwrite(fd, expected, 0)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN)
+            return fd, mmap.mmap(fd, size)
+        except BaseException:
+            os.close(fd)
+            raise
+
+    def close(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
+
+    # ========== 槽位读写 ==========
+
+    def _home(self, gid: int, uid: int) -> int:
+        return _mix(gid, uid) % self.slots
+
+    def _read(self, index: int, locked: bool = False) -> tuple[int, int, float]:
+        """
+        读槽位：(群号, QQ号, 最后触发时间)
+
+        locked 表示调用方已持有覆盖该槽位的写锁，此时不会有活着的写者，
+        序号为奇数只可能是写者崩溃留下的，直接修复
+        """
+        mm = self._mm
+        off = _HEADER_SIZE + index * _SLOT.size
+        for _ in range(1 if locked else self._READ_SPINS):
+            seq, _, gid, uid, last = _SLOT.unpack_from(mm, off)
+            if not seq & 1 and _SEQ.unpack_from(mm, off)[0] == seq:
+                return gid, uid, last
+            self.retries += 1
+
+        if locked:
+            return self._repair(index)
+        # 锁住这一个槽位：等正在写的写者完成，或确认写者已经不在了
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, _SLOT.size, off)
+        try:
+            return self._repair(index)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, _SLOT.size, off)
+
+    def _repair(self, index: int) -> tuple[int, int, float]:
+        """持锁读槽位；序号仍为奇数时清空该槽位并恢复为偶数序号"""
+        mm = self._mm
+        off = _HEADER_SIZE + index * _SLOT.size
+        seq, _, gid, uid, last = _SLOT.unpack_from(mm, off)
+        if not seq & 1:
+            return gid, uid, last
+        # 半写的内容不可信，整槽清空（最多让该用户少冷却一次）
+        _SLOT.pack_into(mm, off, (seq + 1) & 0xFFFFFFFF, 0, 0, 0, 0.0)
+        self.repairs += 1
+        return 0, 0, 0.0
+
+    def _write(self, index: int, gid: int, uid: int, last: float) -> None:
+        """写槽位（调用方须持有该窗口的写锁）"""
+        mm = self._mm
+        off = _HEADER_SIZE + index * _SLOT.size
+        # 崩溃写者留下的奇数序号先取整到偶数，保证写完后序号为偶数
+        seq = _SEQ.unpack_from(mm, off)[0]
+        seq += seq & 1
+        _SEQ.pack_into(mm, off, (seq + 1) & 0xFFFFFFFF)
+        _SLOT.pack_into(mm, off, (seq + 1) & 0xFFFFFFFF, 0, gid, uid, last)
+        _SEQ.pack_into(mm, off, (seq + 2) & 0xFFFFFFFF)
+
+    def _find(
+        self, home: int, gid: int, uid: int, locked: bool = False
+    ) -> tuple[int, float]:
+        """在探测窗口里找键，返回 (槽位, 最后触发时间)；找不到返回 (-1, 0)"""
+        for index in range(home, home + self.PROBE):
+            sgid, suid, last = self._read(index, locked)
+            if last and sgid == gid and suid == uid:
+                return index, last
+        return -1, 0.0
+
+    def _lock(self, home: int, op: int) -> None:
+        fcntl.lockf(
+            self._fd, op, self.PROBE * _SLOT.size, _HEADER_SIZE + home * _SLOT.size
+        )
+
+    # ========== 冷却接口 ==========
+
+    @property
+    def live(self) -> int:
+        """当前仍在冷却期内的条目数（全表扫描，仅供统计）"""
+        deadline = self._clock() - self.cd
+        return sum(
+            1
+            for index in range(self.slots + self.PROBE)
+            if self._read(index)[2] > deadline
+        )
+
+    def allow(self, group_id: int | None, user_id: int) -> bool:
+        gid = int(group_id or 0)
+        uid = int(user_id)
+        home = self._home(gid, uid)
+
+        # 无锁快速路径：冷却中直接拒绝
+        now = self._clock()
+        _, last = self._find(home, gid, uid)
+        if last and now - last < self.cd:
+            return False
+
+        self._lock(home, fcntl.LOCK_EX)
+        try:
+            # 加锁后重查：其他进程可能刚刚放行了同一个人
+            now = self._clock()
+            index, last = self._find(home, gid, uid, locked=True)
+            if index >= 0 and now - last < self.cd:
+                return False
+            if index < 0:
+                index = self._victim(home, now)
+            self._write(index, gid, uid, now)
+        finally:
+            self._lock(home, fcntl.LOCK_UN)
+
+        if self.on_trigger is not None:
+            self.on_trigger(gid, uid)
+        return True
+
+    def _victim(self, home: int, now: float) -> int:
+        """窗口内挑一个可写槽位：空位 > 已过期 > 最旧"""
+        oldest, oldest_at = home, float("inf")
+        for index in range(home, home + self.PROBE):
+            _, _, last = self._read(index, locked=True)
+            if not last:
+                return index
+            if last < oldest_at:
+                oldest, oldest_at = index, last
+        if now - oldest_at < self.cd:
+            self.evictions += 1
+        return oldest
+
+    def remaining(self, group_id: int | None, user_id: int) -> float:
+        gid = int(group_id or 0)
+        uid = int(user_id)
+        _, last = self._find(self._home(gid, uid), gid, uid)
+        if not last:
+            return 0.0
+        return max(self.cd - (self._clock() - last), 0.0)
+
+    def reset(self, group_id: int | None, user_id: int) -> None:
+        gid = int(group_id or 0)
+        uid = int(user_id)
+        home = self._home(gid, uid)
+        self._lock(home, fcntl.LOCK_EX)
+        try:
+            index, _ = self._find(home, gid, uid, locked=True)
+            if index >= 0:
+                self._write(index, 0, 0, 0.0)
+        finally:
+            self._lock(home, fcntl.LOCK_UN)
+
+    def clear(self) -> None:
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            for index in range(self.slots + self.PROBE):
+                self._write(index, 0, 0, 0.0)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def restore(self, entries: Iterable[tuple[int, int, float]]) -> int:
+        """共享文件本身跨重启保留，无需从其他存储恢复"""
+        return 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "live": self.live,
+            "slots": self.slots,
+            "evictions": self.evictions,
+            "retries": self.retries,
+            "repairs": self.repairs,
+        }
@@ -0,0 +1,51 @@
+# core/speakers.py
+from __future__ import annotations
+
+from array import array
+from collections import OrderedDict
+
+
+class RecentSpeakers:
+    """
+    每个群最近发言的不同用户
+
+    - 每群一个定长 int64 数组，按发言先后排列，重复发言者移到队尾
+    - 最多跟踪 max_groups 个群（LRU）
+    """
+
+    def __init__(self, size: int = 20, max_groups: int = 1024):
+        self.size = max(1, size)
+        self.max_groups = max(1, max_groups)
+        self._groups: OrderedDict[int, array] = OrderedDict()
+
+    def record(self, group_id: int, user_id: int) -> None:
+        """记录一次群发言"""
+        buf = self._groups.get(group_id)
+        if buf is None:
+            buf = self._groups[group_id] = array("q")
+            if len(self._groups) > self.max_groups:
+                self._groups.popitem(last=False)
+        else:
+            self._groups.move_to_end(group_id)
+            if buf[-1] == user_id:
+                return
+
+        # 每条群消息都会走到这里：先用 in 判断，避免未命中时抛 ValueError 的开销
+        if user_id in buf:
+            del buf[buf.index(user_id)]
+        elif len(buf) >= self.size:
+            del buf[0]
+        buf.append(user_id)
+
+    def seed(self, group_id: int, user_ids: list[int]) -> None:
+        """冷启动时用历史消息填充（按时间先后）"""
+        for uid in user_ids:
+            self.record(group_id, uid)
+
+    def get(self, group_id: int) -> list[int]:
+        """最近发言者，最新的在前"""
+        buf = self._groups.get(group_id)
+        return buf.tolist()[::-1] if buf else []
+
+    def stats(self) -> dict[str, int]:
+        return {"groups": len(self._groups)}
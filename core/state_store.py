@@ -0,0 +1,178 @@
+# core/state_store.py
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from astrbot.api import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cooldowns (
+    group_id   INTEGER NOT NULL,
+    user_id    INTEGER NOT NULL,
+    last_at    REAL    NOT NULL,
+    PRIMARY KEY (group_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS cooldowns_last_at ON cooldowns (last_at);
+CREATE TABLE IF NOT EXISTS poke_counts (
+    group_id   INTEGER NOT NULL,
+    user_id    INTEGER NOT NULL,
+    count      INTEGER NOT NULL,
+    updated_at REAL    NOT NULL,
+    PRIMARY KEY (group_id, user_id)
+);
+"""
+
+
+class StateStore:
+    """
+    运行时状态的写回式持久化（SQLite WAL）
+
+    - 冷却记录与戳一戳计数先在内存中合并，定期或关闭时批量写盘，
+      热路径只做一次字典写入，从不等待磁盘
+    - 启动时只加载仍在冷却期内的记录，写盘时顺带清理已过期的记录
+    - 时间统一存墙钟时间（time.time），重启后仍可换算剩余冷却
+    """
+
+    def __init__(self, db_path: Path, flush_interval: float = 5.0):
+        self.db_path = db_path
+        self.flush_interval = max(0.1, flush_interval)
+        self._cooldowns: dict[tuple[int, int], float] = {}
+        self._counts: dict[tuple[int, int], int] = {}
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._ttl = 0.0
+
+        # 统计
+        self.flushes = 0
+        self.rows_written = 0
+        self.last_flush_ms = 0.0
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ========== 生命周期 ==========
+
+    async def open(self, cooldown_ttl: float) -> list[tuple[int, int, float]]:
+        """建表并启动定期写盘，返回仍在冷却期内的 (群号, QQ号, 已过秒数)，按时间先后"""
+        self._ttl = cooldown_ttl
+        rows = await asyncio.to_thread(self._open, cooldown_ttl)
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+        return rows
+
+    def _open(self, ttl: float) -> list[tuple[int, int, float]]:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            rows = conn.execute(
+                "SELECT group_id, user_id, last_at FROM cooldowns "
+                "WHERE last_at > ? ORDER BY last_at",
+                (now - ttl,),
+            ).fetchall()
+        return [(gid, uid, max(0.0, now - last_at)) for gid, uid, last_at in rows]
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self) -> None:
+        """停止定期写盘，并把剩余的改动写盘"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    # ========== 热路径 ==========
+
+    def mark_cooldown(self, group_id: int, user_id: int) -> None:
+        """记录一次冷却触发（只写内存）"""
+        self._cooldowns[(int(group_id), int(user_id))] = time.time()
+
+    def count_poke(self, group_id: int, user_id: int) -> None:
+        """累计一次戳一戳（只写内存）"""
+        key = (int(group_id), int(user_id))
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    # ========== 写盘 ==========
+
+    async def flush(self) -> None:
+        """把内存中累计的改动批量写盘"""
+        async with self._lock:
+            if not self._cooldowns and not self._counts:
+                return
+            cooldowns, self._cooldowns = self._cooldowns, {}
+            counts, self._counts = self._counts, {}
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._write, cooldowns, counts)
+            except Exception as e:
+                logger.warning(f"[戳一戳] 状态写盘失败，下次重试: {e!r}")
+                # 合并回去；期间的新改动优先
+                for key, ts in cooldowns.items():
+                    self._cooldowns.setdefault(key, ts)
+                for key, n in counts.items():
+                    self._counts[key] = self._counts.get(key, 0) + n
+                return
+            self.flushes += 1
+            self.rows_written += len(cooldowns) + len(counts)
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+    def _write(
+        self,
+        cooldowns: dict[tuple[int, int], float],
+        counts: dict[tuple[int, int], int],
+    ) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO cooldowns (group_id, user_id, last_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (group_id, user_id) DO UPDATE SET last_at = excluded.last_at",
+                [(gid, uid, ts) for (gid, uid), ts in cooldowns.items()],
+            )
+            conn.executemany(
+                "INSERT INTO poke_counts (group_id, user_id, count, updated_at) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (group_id, user_id) DO UPDATE SET "
+                "count = count + excluded.count, updated_at = excluded.updated_at",
+                [(gid, uid, n, now) for (gid, uid), n in counts.items()],
+            )
+            conn.execute("DELETE FROM cooldowns WHERE last_at <= ?", (now - self._ttl,))
+
+    # ========== 查询 ==========
+
+    async def top_pokers(self, group_id: int, n: int = 10) -> list[tuple[int, int]]:
+        """某群戳 bot 最多的用户：(QQ号, 次数)，含尚未写盘的计数"""
+        await self.flush()
+
+        def query() -> list[tuple[int, int]]:
+            with self._connect() as conn:
+                return conn.execute(
+                    "SELECT user_id, count FROM poke_counts WHERE group_id = ? "
+                    "ORDER BY count DESC LIMIT ?",
+                    (group_id, n),
+                ).fetchall()
+
+        return await asyncio.to_thread(query)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "dirty": len(self._cooldowns) + len(self._counts),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "last_flush_ms": round(self.last_flush_ms, 1),
+        }
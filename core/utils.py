@@ -1,8 +1,5 @@
-import random
-
 from aiocqhttp import CQHttp
 
-from astrbot.api import logger
 from astrbot.core.message.components import At
 from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
@@ -65,16 +62,3 @@ def get_ats(
     if block_ids:
         ats.difference_update(block_ids)
     return list(ats)
-
-
-async def get_member_ids(event: AiocqhttpMessageEvent, num: int = 200) -> list[int]:
-    """获取群成员ID列表"""
-    try:
-        members_data = await event.bot.get_group_member_list(
-            group_id=int(event.get_group_id())
-        )
-        user_ids = [member.get("user_id", "") for member in members_data]
-        return random.sample(user_ids, min(num, len(user_ids)))
-    except Exception as e:
-        logger.error(f"获取群成员信息失败：{e}")
-        return []
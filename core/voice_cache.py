@@ -0,0 +1,139 @@
+# core/voice_cache.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from astrbot.api import logger
+
+# 已是 QQ 语音格式，无需转码
+_NATIVE_SUFFIXES = {".silk", ".amr"}
+_PCM_RATE = 24000
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _transcode(src: str, cache_dir: str, ffmpeg: str) -> str:
+    """
+    线程池中执行：把音频转码为 tencent silk，按内容哈希缓存
+
+    解码交给 ffmpeg 子进程，返回缓存文件路径，已缓存则直接返回
+    """
+    dst = os.path.join(cache_dir, f"{_file_digest(src)}.silk")
+    if os.path.exists(dst):
+        return dst
+
+    import pilk  # AstrBot 自带依赖
+
+    with tempfile.TemporaryDirectory(dir=cache_dir) as tmp:
+        pcm = os.path.join(tmp, "audio.pcm")
+        silk = os.path.join(tmp, "audio.silk")
+        cmd = [ffmpeg, "-y", "-i", src, "-f", "s16le", "-ar", str(_PCM_RATE)]
+        subprocess.run(
+            [*cmd, "-ac", "1", pcm],
+            check=True,
+            capture_output=True,
+        )
+        pilk.encode(pcm, silk, pcm_rate=_PCM_RATE, tencent=True)
+        os.replace(silk, dst)
+    return dst
+
+
+class VoiceCache:
+    """
+    语音预转码缓存
+
+    - 启动时用线程池把语音池中的音频预先转码为 silk，按内容哈希存盘
+      （ffmpeg 本身就是子进程，不需要再开进程池）
+    - 缺少 ffmpeg 或 pilk 时只告警一次，整批回退原文件
+    - 发送时直接查表取转码后的文件，未转码完成或转码失败则回退原文件
+    """
+
+    def __init__(self, cache_dir: Path, max_workers: int | None = None):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._ready: dict[str, str] = {}
+        self._task: asyncio.Task | None = None
+
+    def get(self, path: str) -> str:
+        """返回可直接发送的语音文件路径"""
+        return self._ready.get(path, path)
+
+    def start(
+        self, paths: Callable[[], list[str]], ready: threading.Event | None = None
+    ) -> None:
+        """后台开始预转码；给了 ready 时先等它置位（语音目录扫描完成）再取语音池"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._start(paths, ready))
+
+    async def _start(
+        self, paths: Callable[[], list[str]], ready: threading.Event | None
+    ) -> None:
+        if ready is not None:
+            await asyncio.to_thread(ready.wait)
+        await self.prepare(paths())
+
+    async def prepare(self, paths: list[str]) -> None:
+        pending = [
+            p
+            for p in paths
+            if p not in self._ready and Path(p).suffix.lower() not in _NATIVE_SUFFIXES
+        ]
+        if not pending:
+            return
+
+        ffmpeg = shutil.which("ffmpeg")
+        if not ffmpeg:
+            logger.warning("[戳一戳] 未找到 ffmpeg，跳过语音预转码，将发送原文件")
+            return
+        try:
+            import pilk  # noqa: F401
+        except ImportError:
+            logger.warning("[戳一戳] 未安装 pilk，跳过语音预转码，将发送原文件")
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="pokepro-transcode"
+        )
+        try:
+            futures = [
+                loop.run_in_executor(pool, _transcode, p, str(self.cache_dir), ffmpeg)
+                for p in pending
+            ]
+            results = await asyncio.gather(*futures, return_exceptions=True)
+        finally:
+            # 不阻塞事件循环等待转码线程退出
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        done = 0
+        for src, result in zip(pending, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"[戳一戳] 语音预转码失败，将发送原文件：{src}, {result}")
+                continue
+            self._ready[src] = result
+            done += 1
+        logger.debug(f"[戳一戳] 语音预转码完成：{done}/{len(pending)}")
+
+    async def close(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def stats(self) -> dict[str, int]:
+        return {"ready": len(self._ready)}
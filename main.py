@@ -1,3 +1,4 @@
+from astrbot.api import logger
 from astrbot.api.event import filter
 from astrbot.api.star import Context, Star
 from astrbot.core.config.astrbot_config import AstrBotConfig
@@ -5,11 +6,17 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from .core.accounts import AccountRouter
 from .core.config import PluginConfig
+from .core.metrics import REGISTRY, Counter, PrometheusFileExporter
+from .core.model import PokeEvent
+from .core.nickname import NicknameCache
 from .core.on_poke import GetPokeHandler
+from .core.roster import GroupRosterCache
 from .core.scheduler import PokeScheduler
 from .core.send_poke import PokeSender
-from .core.utils import get_ats, get_member_ids
+from .core.speakers import RecentSpeakers
+from .core.utils import get_ats
 
 
 class PokeproPlugin(Star):
@@ -17,24 +24,77 @@ class PokeproPlugin(Star):
         super().__init__(context)
         self.cfg = PluginConfig(config, context)
         self.sender = PokeSender(self.cfg)
-        self.get_poke_handler = GetPokeHandler(context, self.cfg, self.sender)
+        self.accounts = AccountRouter(self.sender)
+        self.nicknames = NicknameCache()
+        self.roster = GroupRosterCache()
+        self.speakers = RecentSpeakers()
+        self.get_poke_handler = GetPokeHandler(
+            context, self.cfg, self.sender, self.nicknames
+        )
         self.scheduler = None
+        self.exporter = None
 
     def _normalize_poke_times(self, times: int | str | None) -> int:
         try:
             value = int(times) if times is not None else 1
         except (TypeError, ValueError):
             value = 1
-        return max(1, min(self.cfg.poke_max_times, value))
+        return max(1, min(self.cfg.snap.poke_max_times, value))
+
+    def _on_notice(self, raw: dict) -> None:
+        """根据通知事件维护本地缓存"""
+        notice_type = raw.get("notice_type")
+        if notice_type == "group_card":
+            self.nicknames.invalidate(raw.get("group_id"), raw.get("user_id", 0))
+        elif notice_type in ("group_increase", "group_decrease"):
+            gid = raw.get("group_id", 0)
+            uid = raw.get("user_id", 0)
+            self_id = raw.get("self_id", 0)
+            if notice_type == "group_increase":
+                self.roster.on_increase(gid, uid)
+            else:
+                self.roster.on_decrease(gid, uid, self_id)
+                self.nicknames.invalidate(gid, uid)
+            if uid == self_id:
+                self.accounts.on_group_change(
+                    self_id, gid, joined=notice_type == "group_increase"
+                )
+
+    async def _recent_speakers(self, event: AiocqhttpMessageEvent) -> list[int]:
+        """最近发言者，仅在本地缓冲冷启动时拉取群消息历史"""
+        gid = int(event.get_group_id())
+        speakers = self.speakers.get(gid)
+        # 缓冲里可能只有发命令的人自己，不足两人视为冷启动
+        if len(speakers) > 1:
+            return speakers
+        try:
+            result: dict = await event.bot.get_group_msg_history(group_id=gid)
+        except Exception as e:
+            logger.warning(f"获取群消息历史失败：{e}")
+            return speakers
+        self.speakers.seed(
+            gid, [int(msg["sender"]["user_id"]) for msg in result["messages"]]
+        )
+        return self.speakers.get(gid)
 
     async def initialize(self):
+        await self.get_poke_handler.initialize()
         if self.cfg.scheduler.enabled:
-            self.scheduler = PokeScheduler(self.cfg, self.sender)
+            self.scheduler = PokeScheduler(self.cfg, self.sender, self.accounts)
             self.scheduler.start()
+        if self.cfg.metrics.export:
+            self.exporter = PrometheusFileExporter(
+                REGISTRY, self.cfg.data_dir / "metrics.prom", self.cfg.metrics.interval
+            )
+            self.exporter.start()
 
     async def terminate(self):
         if self.scheduler:
             self.scheduler.shutdown()
+        if self.exporter:
+            await self.exporter.close()
+        await self.get_poke_handler.terminate()
+        await self.sender.close()
 
     @filter.command("戳", alias={"戳我", "戳全体成员"})
     async def on_poke_cmd(self, event: AiocqhttpMessageEvent):
@@ -51,23 +111,129 @@ class PokeproPlugin(Star):
         target_ids: list[str] = get_ats(event)
         if "我" in msg:
             target_ids.append(event.get_sender_id())
-        if "全体成员" in msg and is_admin:
-            target_ids = [str(mid) for mid in await get_member_ids(event)]
-        if not target_ids:
-            result: dict = await event.bot.get_group_msg_history(group_id=int(gid))
-            target_ids = [str(msg["sender"]["user_id"]) for msg in result["messages"]]
+        if "全体成员" in msg and is_admin and gid:
+            target_ids = [str(mid) for mid in await self.roster.sample(event.bot, gid)]
+        if not target_ids and gid:
+            target_ids = [str(uid) for uid in await self._recent_speakers(event)]
         if self_id in target_ids:
             target_ids.remove(self_id)
         if not target_ids:
             return
 
-        await self.sender.event_send(
-            event,
-            target_ids=target_ids,
-            times=times,
+        # 群内批量戳：分摊给在该群里的所有账号；私聊或还没认出账号时由当前账号发
+        routes = (
+            await self.accounts.split(gid, target_ids)
+            if gid and len(target_ids) > 1
+            else []
         )
+        if routes:
+            for account, client, chunk in routes:
+                self.sender.client_send(
+                    client,
+                    target_ids=chunk,
+                    group_id=gid,
+                    times=times,
+                    self_id=account,
+                )
+        else:
+            self.sender.event_send(
+                event,
+                target_ids=target_ids,
+                times=times,
+            )
         event.stop_event()
 
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("戳状态")
+    async def on_status_cmd(self, event: AiocqhttpMessageEvent):
+        """查看戳一戳的运行状态（群压力、缓存、预生成池等）"""
+        handler = self.get_poke_handler
+        lines = ["【戳一戳状态】"]
+
+        pressure = handler.pressure
+        if pressure:
+            ps = pressure.stats()
+            lines.append(
+                f"降载：跟踪 {ps['groups']} 个群，"
+                f"降级响应 {ps['shed']} 次，丢弃 {ps['dropped']} 次"
+            )
+            lines.append(
+                f"阈值：{pressure.window:g}s 内 ≥{pressure.shed_rate} 降级，"
+                f"≥{pressure.drop_rate} 丢弃"
+            )
+            for gid, rate, level in pressure.hottest(5):
+                lines.append(f"  群 {gid}：{rate:.1f} 次/窗口 [{level}]")
+        else:
+            lines.append("降载：未启用")
+
+        def fmt(name: str, stats: dict) -> str:
+            return f"{name}：" + "，".join(f"{k}={v}" for k, v in stats.items())
+
+        lines.append(fmt("冷却", handler.cooldown.stats()))
+        if handler.state:
+            lines.append(fmt("状态持久化", handler.state.stats()))
+            gid = event.get_group_id()
+            if gid:
+                top = await handler.state.top_pokers(int(gid), 5)
+                if top:
+                    lines.append(
+                        "本群戳 bot 最多："
+                        + "，".join(f"{uid}×{count}" for uid, count in top)
+                    )
+        lines.append(fmt("昵称缓存", self.nicknames.stats()))
+        lines.append(fmt("群成员缓存", self.roster.stats()))
+        lines.append(fmt("发言者缓冲", self.speakers.stats()))
+        if handler.image_cache:
+            lines.append(fmt("图片缓存", handler.image_cache.stats()))
+        lines.append(fmt("语音缓存", handler.voice_cache.stats()))
+        if handler.reply_pool:
+            lines.append(fmt("LLM 预生成", handler.reply_pool.stats()))
+        lines.append(fmt("账号（所在群数）", self.accounts.stats()))
+        lines.append(fmt("发戳", self.sender.stats()))
+        # 账号级全部列出，群级只列最慢的 5 个
+        pacers = self.sender.pacers()
+        pacers = [p for p in pacers if p[1] is None] + sorted(
+            (p for p in pacers if p[1] is not None), key=lambda p: -p[2].interval
+        )[:5]
+        for account, gid, pacer in pacers:
+            where = f"{account}@群{gid}" if gid is not None else f"{account}（账号）"
+            lines.append(
+                f"  速率 {where}：间隔 {pacer.interval:.2f}s，"
+                f"加速 {pacer.increases} 次，减速 {pacer.decreases} 次"
+            )
+        for account, gid, breaker in self.sender.breakers():
+            lines.append(
+                f"  熔断 {account}@群{gid}：{breaker.state}，"
+                f"连续失败 {breaker.failures}，拒绝 {breaker.rejected}，"
+                f"{breaker.retry_in():.0f}s 后试探"
+            )
+        if self.scheduler:
+            for report in self.scheduler.reports.values():
+                lines.append(
+                    f"定时任务 {report.job}：{report.groups} 个群，"
+                    f"成功 {report.sent}，失败 {report.failed}，"
+                    f"耗时 {report.duration:.1f}s"
+                )
+        yield event.plain_result("\n".join(lines))
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("戳指标")
+    async def on_metrics_cmd(self, event: AiocqhttpMessageEvent):
+        """查看戳一戳的计数与耗时指标"""
+        lines = ["【戳一戳指标】"]
+        for metric in REGISTRY:
+            if isinstance(metric, Counter):
+                for labels, value in sorted(metric.items()):
+                    lines.append(f"{metric.name}{list(labels) or ''}：{value}")
+            else:
+                for labels, (n, avg, p50, p99) in sorted(metric.summary().items()):
+                    lines.append(
+                        f"{metric.name}{list(labels) or ''}：{n} 次，"
+                        f"平均 {avg * 1000:.1f}ms，p50≤{p50 * 1000:g}ms，"
+                        f"p99≤{p99 * 1000:g}ms"
+                    )
+        yield event.plain_result("\n".join(lines))
+
     @filter.llm_tool()
     async def llm_poke_user(
         self,
@@ -91,32 +257,52 @@ class PokeproPlugin(Star):
         actual_times = self._normalize_poke_times(times)
 
         try:
-            await self.sender.event_send(
+            ticket = await self.sender.event_send(
                 event,
                 target_ids=[user_id],
                 times=actual_times,
             )
-            return f"已戳用户 {user_id} {actual_times} 次"
         except Exception as e:
             return f"戳一戳失败：{e}"
+        if not ticket.sent:
+            return f"戳一戳失败：{actual_times} 次均未成功"
+        return f"已戳用户 {user_id} {ticket.sent} 次"
 
     @filter.platform_adapter_type(filter.PlatformAdapterType.AIOCQHTTP)
     @filter.event_message_type(filter.EventMessageType.ALL)
     async def on_message(self, event: AiocqhttpMessageEvent):
         """监听消息"""
-        # 设置定时器用的客户端
-        if self.scheduler:
-            self.scheduler.set_client(event.bot)
+        raw = event.message_obj.raw_message
+        if not isinstance(raw, dict):
+            raw = {}
+        post_type = raw.get("post_type")
+
+        # 记录账号及其所在群（定时戳/批量戳路由用）
+        self.accounts.observe(event.get_self_id(), event.bot, raw.get("group_id"))
+
+        # 通知事件：维护缓存；戳一戳通知交给响应处理，其余通知到此为止
+        if post_type == "notice":
+            self._on_notice(raw)
+            if self.cfg.snap.on_poke and PokeEvent.is_poke(raw):
+                async for msg in self.get_poke_handler.handle(event):
+                    yield msg
+            return
+
+        # 群消息：记录发言者
+        if post_type == "message" and raw.get("message_type") == "group":
+            self.speakers.record(int(raw["group_id"]), int(raw["user_id"]))
+
+        # 快速路径：没有唤醒 bot 的普通消息（绝大多数流量）到此为止
+        if not event.is_at_or_wake_command:
+            return
 
-        # 收到自己被戳的事件
-        if self.cfg.on_poke:
-            async for msg in self.get_poke_handler.handle(event):
-                yield msg
+        # 对话切换/重置命令：失效对话缓存
+        self.get_poke_handler.llm.watch_command(event)
 
         # 关键字触发戳一戳
-        if event.is_at_or_wake_command and self.cfg.poke_keywords:
+        if self.cfg.snap.poke_keywords:
             if self.cfg.hit_poke_keywords(event.message_str):
-                await self.sender.event_send(
+                self.sender.event_send(
                     event,
                     target_ids=[event.get_sender_id()],
                     times=1,